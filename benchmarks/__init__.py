@@ -0,0 +1 @@
+"""Ecocompteur benchmarks."""
@@ -0,0 +1,162 @@
+"""
+Benchmark of the incremental sync of the device logs.
+
+Starts the multi-device simulator (simulator/loadtest.py) with a single
+device, in accelerated time so that its logs grow by a row every few seconds.
+On every round, log1.csv is read whole, then from the offset reached by the
+previous round, and both reads are checked to yield the same new rows. The
+bytes received by both reads are reported.
+
+Run from the repository root, which makes the integration importable as the
+custom_components namespace package:
+
+    python -m benchmarks.log_sync --history-days 30 --rounds 5
+
+Without --no-ranges the simulator answers range requests. With it, the
+client falls back to reading the logs whole, and only the row checks apply.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import aclosing
+from pathlib import Path
+
+import httpx
+from homeassistant.const import EVENT_HOMEASSISTANT_CLOSE
+from homeassistant.core import HomeAssistant
+
+from custom_components.ecocompteur.api import Ecocompteur
+
+ROOT = Path(__file__).resolve().parent.parent
+SIMULATOR = ROOT / "simulator" / "loadtest.py"
+
+SIMULATOR_STARTUP_TIMEOUT = 30
+
+
+def _free_port() -> int:
+    """Return a free TCP port on the loopback interface."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _async_wait_ready(host: str) -> None:
+    """Wait until the simulator answers."""
+    deadline = time.monotonic() + SIMULATOR_STARTUP_TIMEOUT
+    async with httpx.AsyncClient() as client:
+        while True:
+            try:
+                await client.get(f"http://{host}/inst.json")
+            except httpx.TransportError:
+                if time.monotonic() > deadline:
+                    raise
+                await asyncio.sleep(0.2)
+            else:
+                return
+
+
+def _row_time(row: str) -> str:
+    """Return the date and hour of a log1.csv row, which sort as text."""
+    return row[: len("YYYY-MM-DD,HH:MM")]
+
+
+async def _async_read(client: Ecocompteur, offset: int) -> tuple[list[str], int, int]:
+    """Return the complete rows read from offset, the end offset and the bytes."""
+    received = client.metrics.received["log1.csv"]
+    rows = []
+    end = offset
+    async with aclosing(client.stream_log1(offset)) as lines:
+        async for line in lines:
+            if line.end == line.start:
+                break
+            if line.start != 0:
+                rows.append(line.text)
+            end = line.end
+    return rows, end, client.metrics.received["log1.csv"] - received
+
+
+async def _async_run(args: argparse.Namespace, host: str) -> bool:
+    """Sync the log of the simulated device, round after round."""
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = HomeAssistant(config_dir)
+        client = Ecocompteur(hass, host)
+        try:
+            rows, offset, _ = await _async_read(client, 0)
+            print(f"{'round':>5} {'rows':>6} {'new':>4} {'full B':>8} {'tail B':>7}")  # noqa: T201
+            for idx in range(1, args.rounds + 1):
+                await asyncio.sleep(args.interval)
+                full, _, full_bytes = await _async_read(client, 0)
+                tail, offset, tail_bytes = await _async_read(client, offset)
+                # Skip rows read again by timestamp, as the importer does
+                tail = [row for row in tail if _row_time(row) > _row_time(rows[-1])]
+                # The device may have logged a row between both reads
+                if full != (rows + tail)[: len(full)]:
+                    print(f"round {idx}: incremental rows differ from a full read")  # noqa: T201
+                    return False
+                rows += tail
+                print(  # noqa: T201
+                    f"{idx:>5} {len(rows):>6} {len(tail):>4} "
+                    f"{full_bytes:>8} {tail_bytes:>7}"
+                )
+        finally:
+            # Closes the HTTP client, as when Home Assistant stops
+            hass.bus.async_fire(EVENT_HOMEASSISTANT_CLOSE)
+            await hass.async_block_till_done()
+    return True
+
+
+def _parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--history-days", type=float, default=30.0)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument(
+        "--interval", type=float, default=2.0, help="seconds between two rounds"
+    )
+    parser.add_argument(
+        "--speed", type=float, default=3600.0, help="simulated seconds per second"
+    )
+    parser.add_argument(
+        "--no-ranges",
+        action="store_true",
+        help="don't let the simulator answer range requests",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Run the benchmark."""
+    args = _parse_args(argv)
+    port = _free_port()
+    process = subprocess.Popen(  # noqa: S603
+        [
+            sys.executable,
+            str(SIMULATOR),
+            "--devices=1",
+            f"--port={port}",
+            f"--speed={args.speed}",
+            f"--history-days={args.history_days}",
+            *(() if args.no_ranges else ("--ranges",)),
+        ],
+        cwd=SIMULATOR.parent,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    host = f"127.0.0.1:{port}/dev/0"
+    try:
+        asyncio.run(_async_wait_ready(host))
+        ok = asyncio.run(_async_run(args, host))
+    finally:
+        process.terminate()
+        process.wait()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Micro-benchmark of the data.json parser.
+
+Compares the former regex rewrite + json.loads path with parse_data and with
+the unchanged-body check of Ecocompteur.fetch_data. Also compares the former
+nested dicts with the EcocompteurConfig snapshots parse_data returns: memory
+held by a parsed document, and cost of finding out nothing changed.
+
+Run from the repository root, which makes the integration importable as the
+custom_components namespace package:
+
+    python -m benchmarks.parse_data
+"""
+
+import gc
+import json
+import re
+import sys
+import timeit
+from typing import Any
+
+from custom_components.ecocompteur.api import parse_data
+
+# As served by a 412000 device: padded labels and zero-padded counters
+DEVICE_PAYLOAD = """{
+"option_tarifaire" : 4,
+"tarif_courant" : 11,
+"isousc" : 045,
+"conso_base" : 0,
+"conso_hc"   : 012345678,
+"conso_hp"   : 023456789,
+"conso_hc_b" : 0,
+"conso_hp_b" : 0,
+"conso_hc_w" : 0,
+"conso_hp_w" : 0,
+"conso_hc_r" : 0,
+"conso_hp_r" : 0,
+"type_imp_0" : 1,
+"type_imp_1" : 1,
+"type_imp_2" : 1,
+"type_imp_3" : 1,
+"type_imp_4" : 1,
+"type_imp_5" : 1,
+"label_entree1" : "Consommation globale",
+"label_entree2" : "Cumulus             ",
+"label_entree3" : "Cuisine             ",
+"label_entree4" : "Prises de Courant",
+"label_entree5" : "Informatique        ",
+"label_entree_imp0" : "Eau",
+"label_entree_imp1" : "Eau",
+"label_entree_imp2" : "Eau",
+"label_entree_imp3" : "Eau",
+"label_entree_imp4" : "Eau",
+"label_entree_imp5" : "Eau",
+"entree_imp0_disabled" : 0,
+"entree_imp1_disabled" : 1,
+"entree_imp2_disabled" : 1,
+"entree_imp3_disabled" : 1,
+"entree_imp4_disabled" : 1,
+"entree_imp5_disabled" : 1
+}"""
+
+# As served by simulator/app.py: valid JSON on a single line
+SIMULATOR_PAYLOAD = json.dumps(
+    {
+        "option_tarifaire": 4,
+        "tarif_courant": 11,
+        "isousc": 45,
+        "conso_base": 0,
+        "conso_hc": 12345678,
+        "conso_hp": 23456789,
+        **{f"conso_{key}": 0 for key in ("hc_b", "hp_b", "hc_w", "hp_w")},
+        **{f"conso_{key}": 0 for key in ("hc_r", "hp_r")},
+        **{f"type_imp_{i}": 1 for i in range(6)},
+        "label_entree1": "Consommation globale",
+        "label_entree2": "Cumulus             ",
+        "label_entree3": "Cuisine             ",
+        "label_entree4": "Prises de Courant",
+        "label_entree5": "Informatique        ",
+        **{f"label_entree_imp{i}": "Eau" for i in range(6)},
+        **{f"entree_imp{i}_disabled": int(i > 0) for i in range(6)},
+    }
+)
+
+NUMBER = 20000
+
+
+def legacy_parse_data(text: str) -> dict[str, Any]:
+    """Parse data.json the way fetch_data used to."""
+    j = json.loads(re.sub(r":\s*0+([1-9]\d*)", r": \1", text))
+    ret: dict[str, Any] = {
+        "option_tarifaire": j["option_tarifaire"],
+        "tarif_courant": j["tarif_courant"],
+        "isousc": j["isousc"],
+        "conso": {
+            key: j[f"conso_{key}"]
+            for key in ("base", "hc", "hp", "hc_b", "hp_b", "hc_w", "hp_w", "hc_r")
+        }
+        | {"hp_r": j["conso_hp_r"]},
+        "inputs": [],
+    }
+    for i in range(1, 6):
+        label = j[f"label_entree{i}"].strip()
+        ret["inputs"].append({"label": label, "type": 0, "disabled": False})
+    for i in range(6):
+        disabled = bool(j[f"entree_imp{i}_disabled"])
+        label = "N/A" if disabled else j[f"label_entree_imp{i}"].strip()
+        ret["inputs"].append(
+            {"label": label, "type": j[f"type_imp_{i}"], "disabled": disabled}
+        )
+    return ret
+
+
+def _deep_size(obj: object) -> int:
+    """Return the memory held by an object and everything it references."""
+    seen: set[int] = set()
+    pending = [obj]
+    size = 0
+    while pending:
+        item = pending.pop()
+        if id(item) in seen or isinstance(item, type):
+            continue
+        seen.add(id(item))
+        size += sys.getsizeof(item)
+        pending.extend(gc.get_referents(item))
+    return size
+
+
+def _run(name: str, payload: str) -> None:
+    """Time every parsing path on a payload."""
+    body = payload.encode()
+    previous = bytes(body)
+    legacy, legacy_previous = legacy_parse_data(payload), legacy_parse_data(payload)
+    snapshot, snapshot_previous = parse_data(payload), parse_data(payload)
+    if snapshot.as_dict() != legacy:
+        msg = f"{name} payload parsed differently"
+        raise AssertionError(msg)
+
+    for label, stmt in (
+        ("former fetch_data", lambda: legacy_parse_data(payload)),
+        ("parse_data", lambda: parse_data(payload)),
+        ("unchanged body", lambda: body == previous),
+        ("unchanged dicts", lambda: legacy == legacy_previous),
+        ("unchanged snapshot", lambda: snapshot == snapshot_previous),
+    ):
+        best = min(timeit.repeat(stmt, number=NUMBER, repeat=5)) / NUMBER
+        print(f"{name:>9} | {label:<27} | {best * 1e6:8.2f} µs")  # noqa: T201
+
+    for label, result in (("former fetch_data", legacy), ("parse_data", snapshot)):
+        size = _deep_size(result)
+        print(f"{name:>9} | {label + ' memory':<27} | {size:8d} B")  # noqa: T201
+
+
+if __name__ == "__main__":
+    _run("device", DEVICE_PAYLOAD)
+    _run("simulator", SIMULATOR_PAYLOAD)
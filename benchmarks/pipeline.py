@@ -0,0 +1,364 @@
+"""
+End-to-end benchmark of the polling pipeline.
+
+Starts the multi-device simulator (simulator/loadtest.py) in a subprocess and
+a bare Home Assistant instance with one config entry per simulated device,
+then measures for every device count:
+
+- poll latency: wall time of a data coordinator refresh (fetch, parse and
+  entity updates), while all devices are refreshed concurrently
+- CPU time per refresh, of the Home Assistant process
+- peak memory allocated during a refresh, traced with tracemalloc
+- state writes per minute, while coordinators poll on their own schedule
+
+Run from the repository root, which makes the integration importable as the
+custom_components namespace package:
+
+    python -m benchmarks.pipeline --devices 1 10 100
+
+Use --output to append the results, stamped with the current commit, to a
+JSON Lines file and compare them across commits.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any, Self
+
+import httpx
+from homeassistant import config_entries, loader
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_HOST, CONF_NAME, EVENT_STATE_CHANGED
+from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.helpers import (
+    area_registry,
+    category_registry,
+    device_registry,
+    entity_registry,
+    floor_registry,
+    issue_registry,
+    label_registry,
+    restore_state,
+)
+from homeassistant.helpers import recorder as recorder_helper
+from homeassistant.helpers.entity_platform import async_get_platforms
+from homeassistant.setup import async_setup_component
+
+# Imported the way Home Assistant imports custom integrations, so that the
+# coordinators found at runtime are instances of the same class
+from custom_components.ecocompteur.const import DOMAIN
+from custom_components.ecocompteur.coordinator import (
+    EcocompteurDataUpdateCoordinator,
+)
+
+ROOT = Path(__file__).resolve().parent.parent
+SIMULATOR = ROOT / "simulator" / "loadtest.py"
+
+SIMULATOR_STARTUP_TIMEOUT = 30
+
+
+def _free_port() -> int:
+    """Return a free TCP port on the loopback interface."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _git_revision() -> str | None:
+    """Return the current commit, if any."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],  # noqa: S607
+            capture_output=True,
+            check=True,
+            cwd=ROOT,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _percentile(values: list[float], percentile: int) -> float:
+    """Return a percentile of a list of values."""
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[percentile - 1]
+
+
+class Simulator:
+    """Multi-device simulator running in a subprocess."""
+
+    def __init__(self, devices: int, args: argparse.Namespace) -> None:
+        """Initialize the simulator."""
+        self.devices = devices
+        self.port = _free_port()
+        self._args = args
+        self._process: subprocess.Popen[bytes] | None = None
+
+    @property
+    def hosts(self) -> list[str]:
+        """Return the host of every simulated device."""
+        return [f"127.0.0.1:{self.port}/dev/{idx}" for idx in range(self.devices)]
+
+    async def __aenter__(self) -> Self:
+        """Start the simulator and wait until it answers."""
+        self._process = subprocess.Popen(  # noqa: S603, ASYNC220
+            [
+                sys.executable,
+                str(SIMULATOR),
+                f"--devices={self.devices}",
+                f"--port={self.port}",
+                f"--latency={self._args.latency}",
+                f"--jitter={self._args.jitter}",
+                f"--error-rate={self._args.error_rate}",
+                "--leading-zeros",
+            ],
+            cwd=SIMULATOR.parent,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        deadline = time.monotonic() + SIMULATOR_STARTUP_TIMEOUT
+        async with httpx.AsyncClient() as client:
+            while True:
+                try:
+                    await client.get(f"http://{self.hosts[-1]}/inst.json")
+                except httpx.TransportError:
+                    if time.monotonic() > deadline:
+                        raise
+                    await asyncio.sleep(0.2)
+                else:
+                    return self
+
+    async def __aexit__(self, *_: object) -> None:
+        """Stop the simulator."""
+        if self._process is not None:
+            self._process.terminate()
+            self._process.wait()
+
+
+async def _async_start_hass(config_dir: Path, hosts: list[str]) -> HomeAssistant:
+    """Start a bare Home Assistant with one config entry per device."""
+    hass = HomeAssistant(str(config_dir))
+    hass.config.skip_pip = True
+    await hass.config.async_load()
+    loader.async_setup(hass)
+    for registry in (
+        category_registry,
+        floor_registry,
+        label_registry,
+        area_registry,
+        device_registry,
+        entity_registry,
+        issue_registry,
+    ):
+        await registry.async_load(hass)
+    await restore_state.async_load(hass)
+    hass.config_entries = config_entries.ConfigEntries(hass, {})
+    await hass.config_entries.async_initialize()
+
+    recorder_helper.async_initialize_recorder(hass)
+    await async_setup_component(
+        hass, "recorder", {"recorder": {"db_url": f"sqlite:///{config_dir}/db.sqlite"}}
+    )
+
+    for idx, host in enumerate(hosts):
+        entry = ConfigEntry(
+            data={CONF_HOST: host, CONF_NAME: f"Ecocompteur {idx}"},
+            discovery_keys={},
+            domain=DOMAIN,
+            minor_version=1,
+            options={},
+            source=config_entries.SOURCE_USER,
+            title=f"Ecocompteur {idx}",
+            unique_id=f"benchmark-{idx}",
+            version=2,
+        )
+        await hass.config_entries.async_add(entry)
+    await hass.async_start()
+    # Let the log import finish so that it doesn't skew the measurements
+    await hass.async_block_till_done(wait_background_tasks=True)
+    return hass
+
+
+def _data_coordinators(hass: HomeAssistant) -> list[EcocompteurDataUpdateCoordinator]:
+    """Return the data coordinator of every config entry."""
+    coordinators: dict[str, EcocompteurDataUpdateCoordinator] = {}
+    for platform in async_get_platforms(hass, DOMAIN):
+        for entity in platform.entities.values():
+            coordinator = getattr(entity, "coordinator", None)
+            if isinstance(coordinator, EcocompteurDataUpdateCoordinator):
+                coordinators[coordinator.name] = coordinator
+    return list(coordinators.values())
+
+
+async def _async_timed_refresh(
+    coordinator: EcocompteurDataUpdateCoordinator,
+    latencies: list[float],
+    failures: list[EcocompteurDataUpdateCoordinator],
+) -> None:
+    start = time.perf_counter()
+    await coordinator.async_refresh()
+    latencies.append(time.perf_counter() - start)
+    if not coordinator.last_update_success:
+        failures.append(coordinator)
+
+
+async def _async_measure_refreshes(
+    coordinators: list[EcocompteurDataUpdateCoordinator], rounds: int
+) -> dict[str, float]:
+    """Refresh every coordinator concurrently, round after round."""
+    latencies: list[float] = []
+    failures: list[EcocompteurDataUpdateCoordinator] = []
+    cpu_start = time.process_time()
+    for _ in range(rounds):
+        await asyncio.gather(
+            *(
+                _async_timed_refresh(coordinator, latencies, failures)
+                for coordinator in coordinators
+            )
+        )
+    cpu = time.process_time() - cpu_start
+    return {
+        "p50_ms": _percentile(latencies, 50) * 1000,
+        "p99_ms": _percentile(latencies, 99) * 1000,
+        "cpu_ms_per_refresh": cpu / len(latencies) * 1000,
+        "failed_refreshes": len(failures),
+    }
+
+
+async def _async_measure_allocations(
+    coordinators: list[EcocompteurDataUpdateCoordinator], rounds: int
+) -> dict[str, float]:
+    """Trace the memory allocated by refreshes, one at a time."""
+    peaks: list[float] = []
+    tracemalloc.start()
+    try:
+        for _ in range(rounds):
+            for coordinator in coordinators:
+                current, _ = tracemalloc.get_traced_memory()
+                tracemalloc.reset_peak()
+                await coordinator.async_refresh()
+                peaks.append(tracemalloc.get_traced_memory()[1] - current)
+    finally:
+        tracemalloc.stop()
+    return {"alloc_kib_per_refresh": statistics.median(peaks) / 1024}
+
+
+async def _async_measure_state_writes(
+    hass: HomeAssistant, duration: float
+) -> dict[str, float]:
+    """Count state writes while coordinators poll on their own schedule."""
+    writes = 0
+
+    @callback
+    def _async_state_changed(_event: Event) -> None:
+        nonlocal writes
+        writes += 1
+
+    unsub = hass.bus.async_listen(EVENT_STATE_CHANGED, _async_state_changed)
+    try:
+        await asyncio.sleep(duration)
+    finally:
+        unsub()
+    return {"state_writes_per_minute": writes * 60 / duration}
+
+
+async def _async_benchmark(devices: int, args: argparse.Namespace) -> dict[str, Any]:
+    """Benchmark the pipeline with a number of devices."""
+    async with Simulator(devices, args) as simulator:
+        config_dir = tempfile.TemporaryDirectory(prefix="ecocompteur-bench-")
+        setup_start = time.perf_counter()
+        hass = await _async_start_hass(Path(config_dir.name), simulator.hosts)
+        result: dict[str, Any] = {
+            "devices": devices,
+            "setup_s": time.perf_counter() - setup_start,
+        }
+        try:
+            # First, while the polling intervals are those of a fresh start
+            result |= await _async_measure_state_writes(hass, args.duration)
+            coordinators = _data_coordinators(hass)
+            result |= await _async_measure_refreshes(coordinators, args.rounds)
+            result |= await _async_measure_allocations(
+                coordinators, args.allocation_rounds
+            )
+        finally:
+            await hass.async_stop()
+            config_dir.cleanup()
+        return result
+
+
+COLUMNS = (
+    ("devices", "devices", "d"),
+    ("setup_s", "setup s", ".2f"),
+    ("p50_ms", "p50 ms", ".2f"),
+    ("p99_ms", "p99 ms", ".2f"),
+    ("cpu_ms_per_refresh", "CPU ms/refresh", ".3f"),
+    ("alloc_kib_per_refresh", "alloc KiB/refresh", ".1f"),
+    ("state_writes_per_minute", "writes/min", ".0f"),
+    ("failed_refreshes", "failed", "d"),
+)
+
+
+async def _async_run(args: argparse.Namespace) -> None:
+    """Run the benchmark and report the results."""
+    print(" | ".join(f"{title:>{len(title)}}" for _, title, _ in COLUMNS))  # noqa: T201
+    results = []
+    for devices in args.devices:
+        result = await _async_benchmark(devices, args)
+        results.append(result)
+        print(  # noqa: T201
+            " | ".join(
+                f"{result[key]:>{len(title)}{spec}}" for key, title, spec in COLUMNS
+            )
+        )
+    if args.output:
+        record = {
+            "revision": _git_revision(),
+            "date": datetime.now(tz=UTC).isoformat(timespec="seconds"),
+            "parameters": {
+                key: value for key, value in vars(args).items() if key != "output"
+            },
+            "results": results,
+        }
+        with args.output.open("a") as output:
+            output.write(json.dumps(record) + "\n")
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse the command line."""
+    parser = argparse.ArgumentParser(description="End-to-end polling benchmark.")
+    parser.add_argument("--devices", type=int, nargs="+", default=[1, 10, 50, 100])
+    parser.add_argument(
+        "--rounds", type=int, default=50, help="concurrent refreshes of every device"
+    )
+    parser.add_argument("--allocation-rounds", type=int, default=5)
+    parser.add_argument(
+        "--duration",
+        type=float,
+        default=60.0,
+        help="seconds of scheduled polling to count state writes over",
+    )
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds")
+    parser.add_argument("--jitter", type=float, default=0.01, help="seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--output", type=Path, help="JSON Lines file to append to")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    # Shutdown stage warnings of a bare instance are noise here
+    logging.getLogger("homeassistant").setLevel(logging.ERROR)
+    asyncio.run(_async_run(parse_args()))
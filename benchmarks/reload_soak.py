@@ -0,0 +1,172 @@
+"""
+Soak test of the config entry lifecycle.
+
+Starts the multi-device simulator (simulator/loadtest.py) with a single
+device and a bare Home Assistant instance with a config entry for it, then
+reloads the entry over and over, and updates its options over and over:
+polling intervals, timeouts and enabled inputs, which are applied without
+reloading. After every batch, the resources that outlive an entry when it
+leaks are counted:
+
+- asyncio tasks of the event loop
+- timers scheduled on the event loop
+- event bus listeners
+- live data coordinators, after garbage collection
+
+All counts should stay flat, whatever the number of reloads.
+
+Run from the repository root, which makes the integration importable as the
+custom_components namespace package:
+
+    python -m benchmarks.reload_soak --reloads 1000 --batch 100
+
+--mode sets the entry up with streaming mode or the shared polling schedule
+instead of polling.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gc
+import logging
+import tempfile
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from homeassistant.config_entries import ConfigEntryState
+
+from benchmarks.pipeline import Simulator, _async_start_hass
+from custom_components.ecocompteur.const import (
+    CONF_CONNECT_TIMEOUT,
+    CONF_HUB_SCHEDULING,
+    CONF_INPUTS,
+    CONF_MAX_SCAN_INTERVAL,
+    CONF_MIN_SCAN_INTERVAL,
+    CONF_STREAMING,
+    DOMAIN,
+)
+from custom_components.ecocompteur.coordinator import (
+    EcocompteurDataUpdateCoordinator,
+)
+from custom_components.ecocompteur.model import SAMPLE_KEYS
+
+MODES = {
+    "polling": {},
+    "streaming": {CONF_STREAMING: True},
+    "hub": {CONF_HUB_SCHEDULING: True},
+}
+
+if TYPE_CHECKING:
+    from homeassistant.core import HomeAssistant
+
+COLUMNS = (
+    ("phase", "phase", ""),
+    ("done", "done", "d"),
+    ("seconds", "seconds", ".1f"),
+    ("tasks", "tasks", "d"),
+    ("timers", "timers", "d"),
+    ("listeners", "listeners", "d"),
+    ("coordinators", "coordinators", "d"),
+)
+
+
+def _counts(hass: HomeAssistant) -> dict[str, int]:
+    """Count the resources that outlive a leaking config entry."""
+    gc.collect()
+    return {
+        "tasks": len(asyncio.all_tasks(hass.loop)),
+        "timers": sum(
+            not handle.cancelled()
+            for handle in hass.loop._scheduled  # type: ignore[attr-defined]  # noqa: SLF001
+        ),
+        "listeners": sum(hass.bus.async_listeners().values()),
+        "coordinators": sum(
+            isinstance(obj, EcocompteurDataUpdateCoordinator)
+            for obj in gc.get_objects()
+        ),
+    }
+
+
+def _report(phase: str, done: int, start: float, hass: HomeAssistant) -> None:
+    """Print a row of counts."""
+    row = {
+        "phase": phase,
+        "done": done,
+        "seconds": time.perf_counter() - start,
+        **_counts(hass),
+    }
+    print(  # noqa: T201
+        " | ".join(f"{row[key]:>{len(title)}{spec}}" for key, title, spec in COLUMNS)
+    )
+
+
+async def _async_settle(hass: HomeAssistant) -> None:
+    """Let the tasks started by a setup or an update run their course."""
+    # Not the background tasks: the streamer and the hub run until unloaded
+    await hass.async_block_till_done()
+
+
+async def _async_run(args: argparse.Namespace) -> None:
+    """Run the soak test and report the counts."""
+    simulator_args = argparse.Namespace(latency=0.0, jitter=0.0, error_rate=0.0)
+    async with Simulator(1, simulator_args) as simulator:
+        config_dir = tempfile.TemporaryDirectory(prefix="ecocompteur-soak-")
+        hass = await _async_start_hass(Path(config_dir.name), simulator.hosts)
+        try:
+            (entry,) = hass.config_entries.async_entries(DOMAIN)
+            if mode_options := MODES[args.mode]:
+                # Sets the entry up again
+                hass.config_entries.async_update_entry(entry, options=mode_options)
+            await _async_settle(hass)
+            print(" | ".join(title for _, title, _ in COLUMNS))  # noqa: T201
+            start = time.perf_counter()
+            _report("reload", 0, start, hass)
+            for done in range(1, args.reloads + 1):
+                await hass.config_entries.async_reload(entry.entry_id)
+                if entry.state is not ConfigEntryState.LOADED:
+                    msg = f"Entry not loaded after reload {done}: {entry.state}"
+                    raise RuntimeError(msg)
+                if not done % args.batch:
+                    await _async_settle(hass)
+                    _report("reload", done, start, hass)
+
+            start = time.perf_counter()
+            for done in range(1, args.updates + 1):
+                hass.config_entries.async_update_entry(
+                    entry,
+                    options={
+                        **entry.options,
+                        CONF_MIN_SCAN_INTERVAL: 1 + done % 2,
+                        CONF_MAX_SCAN_INTERVAL: 60,
+                        CONF_CONNECT_TIMEOUT: 1 + done % 2,
+                        # Every other update, the pulse counters are left out
+                        CONF_INPUTS: list(SAMPLE_KEYS[: 5 if done % 2 else None]),
+                    },
+                )
+                if not done % args.batch:
+                    await _async_settle(hass)
+                    _report("options", done, start, hass)
+        finally:
+            await hass.async_stop()
+            config_dir.cleanup()
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse the command line."""
+    parser = argparse.ArgumentParser(description="Config entry lifecycle soak test.")
+    parser.add_argument("--reloads", type=int, default=1000)
+    parser.add_argument("--updates", type=int, default=1000, help="options updates")
+    parser.add_argument("--mode", choices=MODES, default="polling")
+    parser.add_argument(
+        "--batch", type=int, default=100, help="reloads or updates between reports"
+    )
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    # Shutdown stage warnings of a bare instance are noise here
+    logging.getLogger("homeassistant").setLevel(logging.ERROR)
+    asyncio.run(_async_run(parse_args()))
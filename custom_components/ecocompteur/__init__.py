@@ -1,17 +1,52 @@
 """Support for Legrand Ecocompteur."""
 
+import asyncio
 import ipaddress
 import logging
 import uuid
+from collections.abc import Mapping
 from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any
 
 import voluptuous as vol
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import CONF_HOST, CONF_NAME, Platform
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.device_registry import DeviceInfo
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.storage import Store
+from homeassistant.helpers.typing import ConfigType
 
-from .const import DEFAULT_NAME, DOMAIN
+from .api import CONNECT_TIMEOUT, READ_TIMEOUT, Ecocompteur
+from .const import (
+    CONF_CONNECT_TIMEOUT,
+    CONF_HUB_SCHEDULING,
+    CONF_INPUTS,
+    CONF_MAX_SCAN_INTERVAL,
+    CONF_MIN_SCAN_INTERVAL,
+    CONF_READ_TIMEOUT,
+    CONF_STREAMING,
+    DEFAULT_HUB_SCHEDULING,
+    DEFAULT_MAX_SCAN_INTERVAL,
+    DEFAULT_MIN_SCAN_INTERVAL,
+    DEFAULT_NAME,
+    DEFAULT_STREAMING,
+    DOMAIN,
+    MANUFACTURER,
+    MODEL,
+)
+from .coordinator import (
+    STORAGE_VERSION,
+    EcocompteurConfigUpdateCoordinator,
+    EcocompteurDataUpdateCoordinator,
+)
+from .hub import async_get_hub
+from .importer import LOG_IMPORT_INTERVAL, EcocompteurLogImporter
+from .model import SAMPLE_INDEX, SAMPLE_KEYS
+from .services import async_setup_services
+from .stream import EcocompteurStreamer
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -34,9 +69,13 @@ CONFIG_SCHEMA = vol.Schema(
 )
 
 PLATFORMS: list[str] = [
+    Platform.BINARY_SENSOR,
     Platform.SENSOR,
 ]
 
+# Stores of a config entry, kept by the data coordinator and the log importer
+STORES = ("energy", "tariffs", "rollups", "anomalies", "cache", "import")
+
 
 @dataclass
 class EcocompteurRuntimeData:
@@ -44,6 +83,18 @@ class EcocompteurRuntimeData:
 
     name: str
     host: str
+    client: Ecocompteur
+    coordinator: EcocompteurDataUpdateCoordinator
+    device_info: DeviceInfo
+    # Changing these options sets the entry up again
+    streaming: bool
+    hub_scheduling: bool
+
+
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:  # noqa: ARG001
+    """Set up the Ecocompteur services."""
+    async_setup_services(hass)
+    return True
 
 
 async def async_migrate_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
@@ -69,10 +120,164 @@ async def async_migrate_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     return True
 
 
+def _scan_intervals(options: Mapping[str, Any]) -> tuple[timedelta, timedelta]:
+    """Return the minimum and maximum polling intervals set in the options."""
+    return (
+        timedelta(
+            seconds=options.get(
+                CONF_MIN_SCAN_INTERVAL, DEFAULT_MIN_SCAN_INTERVAL.total_seconds()
+            )
+        ),
+        timedelta(
+            seconds=options.get(
+                CONF_MAX_SCAN_INTERVAL, DEFAULT_MAX_SCAN_INTERVAL.total_seconds()
+            )
+        ),
+    )
+
+
+def _enabled_inputs(options: Mapping[str, Any]) -> set[int]:
+    """Return the indexes of the inputs enabled in the options."""
+    return {SAMPLE_INDEX[key] for key in options.get(CONF_INPUTS, SAMPLE_KEYS)}
+
+
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up Ecocompteur via a config entry."""
     host = entry.data[CONF_HOST]
     name = entry.data.get(CONF_NAME, DEFAULT_NAME)
-    entry.runtime_data = EcocompteurRuntimeData(name=name, host=host)
+    options = entry.options
+    client = Ecocompteur(
+        hass,
+        host,
+        connect_timeout=options.get(CONF_CONNECT_TIMEOUT, CONNECT_TIMEOUT),
+        read_timeout=options.get(CONF_READ_TIMEOUT, READ_TIMEOUT),
+    )
+
+    config_coordinator = EcocompteurConfigUpdateCoordinator(hass, entry, client)
+    min_interval, max_interval = _scan_intervals(options)
+    coordinator = EcocompteurDataUpdateCoordinator(
+        hass,
+        entry,
+        client,
+        config_coordinator,
+        min_interval=min_interval,
+        max_interval=max_interval,
+    )
+    coordinator.async_set_enabled_inputs(_enabled_inputs(options))
+
+    streaming = options.get(CONF_STREAMING, DEFAULT_STREAMING)
+    hub_scheduling = options.get(CONF_HUB_SCHEDULING, DEFAULT_HUB_SCHEDULING)
+    if streaming or hub_scheduling:
+        coordinator.async_disable_polling()
+
+    if await coordinator.async_restore():
+        # Set the entities up from the last known values right away, however
+        # responsive the device is, and refresh them in the background
+        entry.async_create_background_task(
+            hass,
+            coordinator.async_refresh_restored(),
+            f"{DOMAIN} {entry.entry_id} refresh",
+        )
+    else:
+        await coordinator.async_config_entry_first_refresh()
+    # data.json is only polled while its coordinator has listeners, and there
+    # may be no TIC sensor at all: keep it polled for as long as the entry is
+    # loaded, so that tariff period and input changes are still followed
+    entry.async_on_unload(
+        config_coordinator.async_add_listener(coordinator.async_config_updated)
+    )
+
+    entry.runtime_data = EcocompteurRuntimeData(
+        name=name,
+        host=host,
+        client=client,
+        coordinator=coordinator,
+        device_info=DeviceInfo(
+            identifiers={(DOMAIN, entry.entry_id)},
+            manufacturer=MANUFACTURER,
+            model=MODEL,
+            name=name,
+        ),
+        streaming=streaming,
+        hub_scheduling=hub_scheduling,
+    )
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+
+    if streaming:
+        streamer = EcocompteurStreamer(hass, coordinator)
+        entry.async_on_unload(streamer.async_shutdown)
+        # Background tasks are cancelled when the entry is unloaded
+        entry.async_create_background_task(
+            hass, streamer.async_run(), f"{DOMAIN} {entry.entry_id} stream"
+        )
+    elif hub_scheduling:
+        entry.async_on_unload(async_get_hub(hass).async_register(coordinator))
+
+    # Backfill the device logs into long-term statistics, then keep them
+    # up to date as new rows are appended
+    importer = EcocompteurLogImporter(
+        hass,
+        client,
+        entry.entry_id,
+        name,
+        add_log_totals=coordinator.async_add_log_totals,
+        log_totals_done=coordinator.async_log_totals_done,
+    )
+    entry.async_create_background_task(
+        hass, importer.async_import(), f"{DOMAIN} {entry.entry_id} log import"
+    )
+
+    @callback
+    def _async_import_interval(_now: datetime) -> None:
+        # As a background task of the entry, so that unloading cancels it
+        entry.async_create_background_task(
+            hass, importer.async_import(), f"{DOMAIN} {entry.entry_id} log import"
+        )
+
+    entry.async_on_unload(
+        async_track_time_interval(hass, _async_import_interval, LOG_IMPORT_INTERVAL)
+    )
+    entry.async_on_unload(entry.add_update_listener(async_update_options))
     return True
+
+
+async def async_update_options(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """
+    Apply the options of a config entry when they change.
+
+    Polling intervals, timeouts and enabled inputs are applied in place. The
+    entry is only set up again when the update mode changes.
+    """
+    runtime_data: EcocompteurRuntimeData = entry.runtime_data
+    options = entry.options
+    if (
+        options.get(CONF_STREAMING, DEFAULT_STREAMING) != runtime_data.streaming
+        or options.get(CONF_HUB_SCHEDULING, DEFAULT_HUB_SCHEDULING)
+        != runtime_data.hub_scheduling
+    ):
+        await hass.config_entries.async_reload(entry.entry_id)
+        return
+
+    runtime_data.client.set_timeouts(
+        options.get(CONF_CONNECT_TIMEOUT, CONNECT_TIMEOUT),
+        options.get(CONF_READ_TIMEOUT, READ_TIMEOUT),
+    )
+    runtime_data.coordinator.async_set_enabled_inputs(_enabled_inputs(options))
+    await runtime_data.coordinator.async_set_scan_intervals(*_scan_intervals(options))
+
+
+async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
+    """Unload an Ecocompteur config entry."""
+    return await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove the data stored for a removed Ecocompteur config entry."""
+    await asyncio.gather(
+        *(
+            Store(
+                hass, STORAGE_VERSION, f"{DOMAIN}.{entry.entry_id}.{name}"
+            ).async_remove()
+            for name in STORES
+        )
+    )
@@ -0,0 +1,132 @@
+"""Detection of abnormal power readings of the Ecocompteur circuits."""
+
+from __future__ import annotations
+
+import math
+from typing import TYPE_CHECKING, Any
+
+from .const import POWER_KEYS
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+# Time constant of the learned mean and variance, in seconds of device time.
+# A day, so that the daily cycles of loads such as water heaters are learned
+# as part of the normal band.
+TIME_CONSTANT = 86400.0
+
+# Seconds of device time learned before readings are judged. Until a whole
+# day was seen, loads that only run at night would be reported every night.
+WARMUP = TIME_CONSTANT
+
+# Weight of the samples learned once WARMUP seconds were
+WARMUP_WEIGHT = -math.expm1(-WARMUP / TIME_CONSTANT)
+
+# A sample weighs at most this many seconds, so that a single reading after
+# a gap in the samples doesn't wipe out what was learned
+MAX_STEP = 300.0
+
+# A reading is abnormal once it is more than BAND_SIGMAS standard deviations
+# plus BAND_MARGIN away from the mean, and normal again once it is back within
+# CLEAR_SIGMAS standard deviations plus BAND_MARGIN. The margin, in W, keeps
+# steady circuits from being reported for a few watts.
+BAND_SIGMAS = 4.0
+CLEAR_SIGMAS = 3.0
+BAND_MARGIN = 100.0
+
+
+class EcocompteurAnomalyDetector:
+    """
+    Report the circuits whose power is outside of their learned band.
+
+    The mean and variance of every circuit are exponentially weighted moving
+    averages over TIME_CONSTANT, weighted by the device time elapsed between
+    samples so that the polling interval doesn't matter. They are corrected
+    for the bias of a short history: weight is the total weight of the samples
+    learned, 1 - (1 - alpha)^n for n samples, and every sample is learned with
+    alpha / weight. They are learned at the same rate whether a circuit is
+    abnormal or not, so that a recurring load ends up within the band; the
+    state itself only changes past the thresholds, with hysteresis. A sample
+    costs a handful of operations per circuit and the state is a few numbers
+    per circuit, whatever the history.
+    """
+
+    def __init__(
+        self,
+        mean: list[float] | None = None,
+        variance: list[float] | None = None,
+        abnormal: list[bool] | None = None,
+        weight: float = 0.0,
+        timestamp: int | None = None,
+    ) -> None:
+        """Initialize the detector."""
+        self.mean = mean or [0.0] * len(POWER_KEYS)
+        self.variance = variance or [0.0] * len(POWER_KEYS)
+        self.abnormal = abnormal or [False] * len(POWER_KEYS)
+        # Total weight of the samples learned so far, from 0 towards 1
+        self.weight = weight
+        self.timestamp = timestamp
+
+    def band(self, circuit: int) -> tuple[float, float]:
+        """Return the bounds of the normal power of a circuit."""
+        width = BAND_SIGMAS * math.sqrt(self.variance[circuit]) + BAND_MARGIN
+        return self.mean[circuit] - width, self.mean[circuit] + width
+
+    def update(self, timestamp: int, power: Sequence[float]) -> list[int]:
+        """Learn from a sample, return the circuits that just turned abnormal."""
+        previous = self.timestamp
+        if previous is not None and timestamp <= previous:
+            if timestamp < previous:
+                # The device clock was set back: learn again from there
+                self.timestamp = timestamp
+            return []
+        self.timestamp = timestamp
+        if previous is None:
+            return []
+
+        elapsed = min(timestamp - previous, MAX_STEP)
+        alpha = -math.expm1(-elapsed / TIME_CONSTANT)
+        judged = self.weight >= WARMUP_WEIGHT
+        self.weight += alpha * (1 - self.weight)
+        # Bias-corrected: the first sample learned sets the mean
+        weight = alpha / self.weight
+
+        turned_abnormal = []
+        for circuit, value in enumerate(power):
+            deviation = value - self.mean[circuit]
+            if judged:
+                sigma = math.sqrt(self.variance[circuit])
+                if self.abnormal[circuit]:
+                    if abs(deviation) <= CLEAR_SIGMAS * sigma + BAND_MARGIN:
+                        self.abnormal[circuit] = False
+                elif abs(deviation) > BAND_SIGMAS * sigma + BAND_MARGIN:
+                    self.abnormal[circuit] = True
+                    turned_abnormal.append(circuit)
+            self.mean[circuit] += weight * deviation
+            self.variance[circuit] = (1 - weight) * (
+                self.variance[circuit] + weight * deviation * deviation
+            )
+        return turned_abnormal
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the detector state to persist."""
+        return {
+            "mean": self.mean,
+            "variance": self.variance,
+            "abnormal": self.abnormal,
+            "weight": self.weight,
+            "timestamp": self.timestamp,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any] | None) -> EcocompteurAnomalyDetector:
+        """Restore the detector from its persisted state."""
+        if not data:
+            return cls()
+        return cls(
+            data["mean"],
+            data["variance"],
+            data["abnormal"],
+            data["weight"],
+            data["timestamp"],
+        )
@@ -1,12 +1,25 @@
 """Helper functions for the Ecocompteur."""
 
+import asyncio
 import json
 import logging
 import re
+from collections.abc import AsyncGenerator, AsyncIterator
+from contextlib import aclosing
+from datetime import UTC, datetime
+from functools import lru_cache
+from time import perf_counter
+from typing import NamedTuple
 
 import httpx
-from homeassistant.core import HomeAssistant
-from homeassistant.helpers.httpx_client import get_async_client
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.httpx_client import create_async_httpx_client
+from homeassistant.util import dt as dt_util
+from homeassistant.util.hass_dict import HassKey
+
+from .const import DOMAIN
+from .metrics import STAGE_PARSE, EcocompteurMetrics
+from .model import CONSO_KEYS, EcocompteurConfig, EcocompteurInput, EcocompteurValues
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -20,30 +33,298 @@ class EcocompteurJSONDecodeError(Exception):
 
 
 STATUS_CODE_OK = 200
+STATUS_CODE_PARTIAL_CONTENT = 206
+STATUS_CODE_NOT_MODIFIED = 304
+STATUS_CODE_RANGE_NOT_SATISFIABLE = 416
+
+# Response validators and the request headers making a GET conditional on them
+_VALIDATORS = (("etag", "if-none-match"), ("last-modified", "if-modified-since"))
+
+# The device's embedded HTTP server struggles with more than a couple of
+# simultaneous connections. Requests are capped rather than connections:
+# idle connections are kept open by the pool of the Home Assistant client,
+# for 15 s, to avoid a TCP handshake on every poll.
+MAX_CONCURRENT_REQUESTS = 2
+
+# Timeouts are kept well below the polling interval, so that a hung device
+# fails the refresh instead of piling up overlapping requests. Log files are
+# much bigger than the JSON documents and get a longer read timeout.
+CONNECT_TIMEOUT = 2
+READ_TIMEOUT = 4
+LOG_READ_TIMEOUT = 30
+
+DATA_CLIENTS: HassKey[dict[str, httpx.AsyncClient]] = HassKey(f"{DOMAIN}_clients")
+
+
+# The device pads integers with leading zeros, which is invalid JSON. Only the
+# padding is dropped: "0", "000" and "0.5" all stay valid numbers. When there
+# is nothing to fix, re.sub returns the text itself rather than a copy.
+_LEADING_ZEROS_RE = re.compile(r":\s*0+(?=\d)")
+
+_CONSO_KEYS = tuple(f"conso_{key}" for key in CONSO_KEYS)
+_LABEL_KEYS = tuple(f"label_entree{i}" for i in range(1, 6))
+_PULSE_KEYS = tuple(
+    (f"label_entree_imp{i}", f"type_imp_{i}", f"entree_imp{i}_disabled")
+    for i in range(6)
+)
+
+
+# Equal inputs are parsed into the same object, so that comparing the inputs of
+# two snapshots stops at identity instead of comparing every field.
+_input = lru_cache(maxsize=256)(EcocompteurInput)
+
+
+def parse_data(text: str) -> EcocompteurConfig:
+    """
+    Parse the data.json document of an Ecocompteur.
+
+    See Ecocompteur.fetch_data for the structure of the result.
+    """
+    try:
+        j = json.loads(_LEADING_ZEROS_RE.sub(":", text))
+        inputs = [
+            _input(j[label_key].strip(), 0, disabled=False) for label_key in _LABEL_KEYS
+        ]
+        for label_key, type_key, disabled_key in _PULSE_KEYS:
+            disabled = bool(j[disabled_key])
+            inputs.append(
+                _input(
+                    "N/A" if disabled else j[label_key].strip(),
+                    j[type_key],
+                    disabled=disabled,
+                )
+            )
+        return EcocompteurConfig(
+            j["option_tarifaire"],
+            j["tarif_courant"],
+            j["isousc"],
+            tuple(j[json_key] for json_key in _CONSO_KEYS),
+            tuple(inputs),
+        )
+    except (json.JSONDecodeError, KeyError, TypeError, AttributeError) as e:
+        raise EcocompteurJSONDecodeError from e
+
+
+def device_time(date_time: float, previous: int | None = None) -> int:
+    """
+    Return the time of a Date_Time field, in seconds since the epoch.
+
+    The device counts its local wall-clock time as if it were UTC: heure and
+    minute are those of Date_Time read in UTC. Its time zone is taken to be
+    that of Home Assistant. Wall-clock times of the hour repeated when clocks
+    go back are ambiguous: they are taken as the first pass of that hour,
+    unless that is earlier than the previous time of the device.
+    """
+    wall_clock = datetime.fromtimestamp(date_time, UTC).replace(
+        tzinfo=dt_util.get_default_time_zone()
+    )
+    timestamp = int(wall_clock.timestamp())
+    if previous is not None and timestamp < previous:
+        timestamp = int(wall_clock.replace(fold=1).timestamp())
+    return timestamp
+
+
+def parse_inst(text: str, previous: int | None = None) -> EcocompteurValues:
+    """
+    Parse the inst.json document of an Ecocompteur.
+
+    previous is the time of the previous sample, see device_time.
+    """
+    try:
+        j = json.loads(text)
+        if (date_time := j.get("Date_Time")) is not None:
+            j["Date_Time"] = device_time(date_time, previous)
+        return EcocompteurValues.from_dict(j)
+    except (
+        json.JSONDecodeError,
+        TypeError,
+        ValueError,
+        AttributeError,
+        OverflowError,
+        OSError,
+    ) as e:
+        raise EcocompteurJSONDecodeError from e
+
+
+class EcocompteurLogLine(NamedTuple):
+    """
+    A line of a log file, with its position in the file.
+
+    end is the offset of the byte following the line ending. It equals start
+    when the line has no line ending yet.
+    """
+
+    start: int
+    end: int
+    text: str
+
+
+async def _iter_lines(
+    chunks: AsyncIterator[bytes], offset: int
+) -> AsyncIterator[EcocompteurLogLine]:
+    """Split a body starting at offset into lines."""
+    pending = b""
+    async for chunk in chunks:
+        *lines, pending = (pending + chunk).split(b"\n")
+        for line in lines:
+            end = offset + len(line) + 1
+            yield EcocompteurLogLine(offset, end, line.decode(errors="replace"))
+            offset = end
+    if pending:
+        # The device may still be writing it
+        yield EcocompteurLogLine(offset, offset, pending.decode(errors="replace"))
+
+
+async def _prepend(head: bytes, chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Yield head, then the chunks."""
+    yield head
+    async for chunk in chunks:
+        yield chunk
+
+
+def _conditional_headers(r: httpx.Response) -> dict[str, str]:
+    """Return the headers making a request conditional on a response."""
+    return {
+        request_header: r.headers[response_header]
+        for response_header, request_header in _VALIDATORS
+        if response_header in r.headers
+    }
+
+
+@callback
+def async_get_client(hass: HomeAssistant, host: str) -> httpx.AsyncClient:
+    """
+    Return the HTTP client of a device, created on first use.
+
+    The client is shared by the config flow and the config entry of the
+    device, and outlives reloads of the entry: Home Assistant closes it when
+    it stops.
+    """
+    clients = hass.data.setdefault(DATA_CLIENTS, {})
+    if (client := clients.get(host)) is None:
+        client = clients[host] = create_async_httpx_client(
+            hass,
+            base_url=f"http://{host}",
+            timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+        )
+    return client
 
 
 class Ecocompteur:
     """Ecocompteur client."""
 
-    def __init__(self, hass: HomeAssistant, host: str) -> None:
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        host: str,
+        *,
+        connect_timeout: float = CONNECT_TIMEOUT,
+        read_timeout: float = READ_TIMEOUT,
+    ) -> None:
         """Initialize an Ecocompteur client."""
         self.hass = hass
         self.host = host
+        self._semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        self._timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self._log_timeout = httpx.Timeout(LOG_READ_TIMEOUT, connect=connect_timeout)
+        self._client = async_get_client(hass, host)
+        self._data_body: bytes | None = None
+        self._data_validators: dict[str, str] = {}
+        self._data: EcocompteurConfig | None = None
+        # Time of the latest inst.json sample, to read ambiguous times against
+        self._inst_time: int | None = None
+        self.metrics = EcocompteurMetrics()
+
+    def set_timeouts(self, connect_timeout: float, read_timeout: float) -> None:
+        """Change the timeouts of the next requests."""
+        self._timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self._log_timeout = httpx.Timeout(LOG_READ_TIMEOUT, connect=connect_timeout)
 
-    async def _fetch(self, name: str) -> httpx.Response:
-        uri = f"http://{self.host}/{name}"
+    async def _fetch(
+        self,
+        name: str,
+        request_timeout: httpx.Timeout | None = None,
+        headers: dict[str, str] | None = None,
+    ) -> httpx.Response:
+        self.metrics.requests[name] += 1
         try:
-            async_client = get_async_client(self.hass)
-            r = await async_client.get(uri, timeout=30)
-            if r.status_code != STATUS_CODE_OK:
+            async with self._semaphore:
+                r = await self._client.get(
+                    name,
+                    headers=headers,
+                    timeout=request_timeout or self._timeout,
+                    extensions={"trace": self.metrics.trace()},
+                )
+            if r.status_code != STATUS_CODE_OK and not (
+                headers and r.status_code == STATUS_CODE_NOT_MODIFIED
+            ):
+                self.metrics.errors[name] += 1
                 msg = f"HTTP {r.status_code}"
                 raise EcocompteurApiError(msg)
         except httpx.HTTPError as e:
+            self.metrics.errors[name] += 1
             raise EcocompteurApiError from e
         else:
             return r
 
-    async def fetch_data(self) -> dict:
+    async def _stream_lines(
+        self, name: str, offset: int = 0
+    ) -> AsyncGenerator[EcocompteurLogLine]:
+        """
+        Stream the lines of a file, from offset when given.
+
+        The file is then requested from the byte before offset, which must
+        still be the line ending it was when read. Otherwise the file was
+        rewritten since, and it is streamed whole, as it is when the device
+        doesn't support range requests.
+
+        The generator holds a request slot and a connection until exhausted:
+        consumers that may stop early must close it, with contextlib.aclosing.
+        """
+        self.metrics.requests[name] += 1
+        headers = {"range": f"bytes={offset - 1}-"} if offset else None
+        try:
+            async with (
+                self._semaphore,
+                self._client.stream(
+                    "GET", name, headers=headers, timeout=self._log_timeout
+                ) as r,
+            ):
+                chunks = self._count_received(name, r.aiter_bytes())
+                if r.status_code == STATUS_CODE_OK:
+                    async for line in _iter_lines(chunks, 0):
+                        yield line
+                    return
+                if r.status_code == STATUS_CODE_PARTIAL_CONTENT:
+                    head = await anext(chunks, b"")
+                    if head[:1] == b"\n":
+                        async for line in _iter_lines(
+                            _prepend(head[1:], chunks), offset
+                        ):
+                            yield line
+                        return
+                elif r.status_code != STATUS_CODE_RANGE_NOT_SATISFIABLE:
+                    self.metrics.errors[name] += 1
+                    msg = f"HTTP {r.status_code}"
+                    raise EcocompteurApiError(msg)
+        except httpx.HTTPError as e:
+            self.metrics.errors[name] += 1
+            raise EcocompteurApiError from e
+
+        _LOGGER.debug("%s of %s was rewritten, reading it again", name, self.host)
+        async with aclosing(self._stream_lines(name)) as lines:
+            async for line in lines:
+                yield line
+
+    async def _count_received(
+        self, name: str, chunks: AsyncIterator[bytes]
+    ) -> AsyncIterator[bytes]:
+        """Count the bytes of a streamed body."""
+        async for chunk in chunks:
+            self.metrics.received[name] += len(chunk)
+            yield chunk
+
+    async def fetch_data(self) -> EcocompteurConfig:
         """
         Fetch Ecocompteur general data.
 
@@ -92,7 +373,8 @@ class Ecocompteur:
             "entree_imp5_disabled" : 1
         }
 
-        Return a well-structured dictionary like this:
+        Return it as an EcocompteurConfig, whose as_dict() is structured like
+        this:
 
         {
             "option_tarifaire" : 4,
@@ -168,49 +450,36 @@ class Ecocompteur:
             ]
         }
         """
-        r = await self._fetch("data.json")
-        raw_text = r.text
+        # Conditional request when the server provided validators last time
+        r = await self._fetch("data.json", headers=self._data_validators or None)
+        if r.status_code == STATUS_CODE_NOT_MODIFIED and self._data is not None:
+            self.metrics.not_modified["data.json"] += 1
+            return self._data
 
-        # Correction des entiers avec des zéros en tête
-        corrected_text = re.sub(r":\s*0+([1-9]\d*)", r": \1", raw_text)
+        body = r.content
+        if body == self._data_body and self._data is not None:
+            # Unchanged body: reuse the previous result rather than parsing. The
+            # coordinator then sees the same data and skips the fan-out too.
+            self.metrics.unchanged["data.json"] += 1
+            self._data_validators = _conditional_headers(r)
+            return self._data
 
+        start = perf_counter()
         try:
-            j = json.loads(corrected_text)
-        except json.JSONDecodeError as e:
-            _LOGGER.exception("JSONDecodeError on corrected JSON")
-            _LOGGER.debug("Corrected JSON: %s", corrected_text)
-            raise EcocompteurJSONDecodeError from e
-
-        ret = {
-            "option_tarifaire": j["option_tarifaire"],
-            "tarif_courant": j["tarif_courant"],
-            "isousc": j["isousc"],
-            "conso": {
-                "base": j["conso_base"],
-                "hc": j["conso_hc"],
-                "hp": j["conso_hp"],
-                "hc_b": j["conso_hc_b"],
-                "hp_b": j["conso_hp_b"],
-                "hc_w": j["conso_hc_w"],
-                "hp_w": j["conso_hp_w"],
-                "hc_r": j["conso_hc_r"],
-                "hp_r": j["conso_hp_r"],
-            },
-            "inputs": [],
-        }
-        for i in range(1, 6):
-            label = j[f"label_entree{i}"].strip()
-            ret["inputs"].append({"label": label, "type": 0, "disabled": False})
-        for i in range(6):
-            label = j[f"label_entree_imp{i}"].strip()
-            stype = j[f"type_imp_{i}"]
-            disabled = bool(j[f"entree_imp{i}_disabled"])
-            if disabled:
-                label = "N/A"
-            ret["inputs"].append({"label": label, "type": stype, "disabled": disabled})
-        return ret
-
-    async def fetch_inst(self) -> dict:
+            data = parse_data(r.text)
+        except EcocompteurJSONDecodeError:
+            self.metrics.errors["data.json"] += 1
+            _LOGGER.exception("Unable to parse data.json")
+            _LOGGER.debug("Raw JSON: %s", r.text)
+            raise
+
+        self.metrics.record(STAGE_PARSE, start)
+        self._data_body = body
+        self._data_validators = _conditional_headers(r)
+        self._data = data
+        return data
+
+    async def fetch_inst(self) -> EcocompteurValues:
         """
         Fetch Ecocompteur real-time data.
 
@@ -237,16 +506,37 @@ class Ecocompteur:
             "CIR4_Vol":0.000000,
             "Date_Time":1727865642
         }
+
+        Return the fields of SAMPLE_KEYS and the timestamp as an
+        EcocompteurValues. Date_Time is in local time, see device_time: this
+        sample was taken at 10:40:42 in the time zone of the device.
         """
         r = await self._fetch("inst.json")
-        return r.json()
+        start = perf_counter()
+        try:
+            data = parse_inst(r.text, self._inst_time)
+        except EcocompteurJSONDecodeError:
+            self.metrics.errors["inst.json"] += 1
+            raise
+        self.metrics.record(STAGE_PARSE, start)
+        if data.timestamp is not None:
+            self._inst_time = data.timestamp
+        return data
+
+    async def fetch_all(self) -> tuple[EcocompteurConfig, EcocompteurValues]:
+        """
+        Fetch Ecocompteur general and real-time data concurrently.
+
+        Both requests are issued at once, so the total latency is the slowest
+        of the two rather than their sum.
+        """
+        data, inst = await asyncio.gather(self.fetch_data(), self.fetch_inst())
+        return data, inst
 
-    async def fetch_log1(self) -> str:
-        """Fetch Ecocompteur statistics."""
-        r = await self._fetch("log1.csv")
-        return r.text
+    def stream_log1(self, offset: int = 0) -> AsyncGenerator[EcocompteurLogLine]:
+        """Stream Ecocompteur hourly statistics line by line, from offset."""
+        return self._stream_lines("log1.csv", offset)
 
-    async def fetch_log2(self) -> str:
-        """Fetch Ecocompteur statistics."""
-        r = await self._fetch("log2.csv")
-        return r.text
+    def stream_log2(self, offset: int = 0) -> AsyncGenerator[EcocompteurLogLine]:
+        """Stream Ecocompteur daily statistics line by line, from offset."""
+        return self._stream_lines("log2.csv", offset)
@@ -0,0 +1,131 @@
+"""Support for Ecocompteur binary sensors."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from functools import partial
+from typing import TYPE_CHECKING
+
+from homeassistant.components.binary_sensor import (
+    BinarySensorDeviceClass,
+    BinarySensorEntity,
+    BinarySensorEntityDescription,
+)
+from homeassistant.const import Platform
+from homeassistant.core import callback
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from .const import POWER_KEYS
+from .coordinator import ANOMALY_CONTEXT
+from .entity import EcocompteurEntityManager
+
+if TYPE_CHECKING:
+    from homeassistant.core import HomeAssistant
+    from homeassistant.helpers.device_registry import DeviceInfo
+    from homeassistant.helpers.entity_platform import AddEntitiesCallback
+
+    from . import EcocompteurConfigEntry
+    from .coordinator import EcocompteurDataUpdateCoordinator
+
+
+@dataclass(frozen=True, kw_only=True)
+class EcocompteurBinarySensorEntityDescription(BinarySensorEntityDescription):
+    """Represent the ecocompteur binary sensor entity description."""
+
+    config_idx: int
+
+
+ANOMALY_SENSORS: tuple[EcocompteurBinarySensorEntityDescription, ...] = tuple(
+    EcocompteurBinarySensorEntityDescription(
+        key=f"{key}_anomaly",
+        config_idx=config_idx,
+        device_class=BinarySensorDeviceClass.PROBLEM,
+    )
+    for config_idx, key in enumerate(POWER_KEYS)
+)
+
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    config_entry: EcocompteurConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+    """Set up Ecocompteur binary sensors."""
+    entry_id = config_entry.entry_id
+    coordinator = config_entry.runtime_data.coordinator
+    device_info = config_entry.runtime_data.device_info
+
+    # Binary sensors of the active circuits, added and removed as inputs are
+    # enabled and disabled in the options or on the device
+    manager = EcocompteurEntityManager(
+        hass,
+        entry_id,
+        Platform.BINARY_SENSOR,
+        async_add_entities,
+        (f"{entry_id}_{description.key}" for description in ANOMALY_SENSORS),
+    )
+    synced: frozenset[int] | None = None
+
+    @callback
+    def _async_sync_anomaly_sensors() -> None:
+        nonlocal synced
+        if (inputs := coordinator.active_inputs) == synced:
+            return
+        synced = inputs
+        manager.async_sync(
+            {
+                f"{entry_id}_{description.key}": partial(
+                    EcocompteurAnomalyBinarySensor,
+                    description,
+                    coordinator,
+                    device_info,
+                    entry_id,
+                )
+                for description in ANOMALY_SENSORS
+                if description.config_idx in inputs
+            }
+        )
+
+    _async_sync_anomaly_sensors()
+    config_entry.async_on_unload(
+        coordinator.async_add_listener(_async_sync_anomaly_sensors)
+    )
+
+
+class EcocompteurAnomalyBinarySensor(CoordinatorEntity, BinarySensorEntity):
+    """Whether the power drawn by a circuit is outside of its learned band."""
+
+    entity_description: EcocompteurBinarySensorEntityDescription
+
+    _attr_has_entity_name = True
+
+    def __init__(
+        self,
+        entity_description: EcocompteurBinarySensorEntityDescription,
+        coordinator: EcocompteurDataUpdateCoordinator,
+        device_info: DeviceInfo,
+        entry_id: str,
+    ) -> None:
+        """Initialize the binary sensor."""
+        super().__init__(
+            coordinator, context=(ANOMALY_CONTEXT, entity_description.config_idx)
+        )
+        self.entity_description = entity_description
+        self._coordinator = coordinator
+        self._attr_device_info = device_info
+        self._attr_unique_id = f"{entry_id}_{entity_description.key}"
+        self._update_attrs()
+
+    def _update_attrs(self) -> None:
+        """Update state attributes."""
+        config_idx = self.entity_description.config_idx
+        config_input = self._coordinator.config_coordinator.data.inputs[config_idx]
+
+        self._attr_name = f"{config_input.label} abnormal load"
+        self._attr_is_on = self._coordinator.anomalies.abnormal[config_idx]
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Handle updated data from the coordinator."""
+        self._update_attrs()
+        self.async_write_ha_state()
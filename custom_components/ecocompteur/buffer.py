@@ -0,0 +1,152 @@
+"""Ring buffer of Ecocompteur real-time samples."""
+
+from __future__ import annotations
+
+from array import array
+from typing import TYPE_CHECKING
+
+from .const import POWER_KEYS
+from .model import SAMPLE_INDEX, SAMPLE_KEYS, EcocompteurValues
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+# 30 minutes at the default 5 s interval
+DEFAULT_CAPACITY = 360
+
+# Bytes of a sample: a 32-bit timestamp, the power of the circuits as floats,
+# and the pulse counters as doubles, so that large counters don't lose their
+# last digits. About 26 KB per device at the default capacity.
+SAMPLE_SIZE = 4 + 4 * len(POWER_KEYS) + 8 * (len(SAMPLE_KEYS) - len(POWER_KEYS))
+
+# Bytes of samples shared by the buffers of all devices. Buffers get smaller
+# as devices are added, down to MIN_CAPACITY, 5 minutes at the default
+# interval. That is about 500 KB for 100 devices.
+MEMORY_BUDGET = 512 * 1024
+MIN_CAPACITY = 60
+
+
+def buffer_capacity(devices: int) -> int:
+    """Return the capacity of every buffer for a number of devices."""
+    capacity = MEMORY_BUDGET // (max(devices, 1) * SAMPLE_SIZE)
+    return max(MIN_CAPACITY, min(DEFAULT_CAPACITY, capacity))
+
+
+class EcocompteurSampleBuffer:
+    """
+    Fixed-size ring buffer of real-time samples.
+
+    Samples are stored in flat arrays of 32-bit integers, floats and doubles
+    rather than in Python objects, and the oldest sample is overwritten once
+    the buffer is full. Samples are kept in device time order, which windows
+    rely on: a sample not stamped, or stamped no later than the latest one,
+    is ignored. After the device clock is set back, the buffer must be
+    cleared for new samples to be kept.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY) -> None:
+        """Initialize the buffer."""
+        self.capacity = capacity
+        self._power_width = len(POWER_KEYS)
+        self._counters_width = len(SAMPLE_KEYS) - len(POWER_KEYS)
+        self._timestamps = array("I", [0]) * capacity
+        self._power = array("f", [0.0]) * (capacity * self._power_width)
+        self._counters = array("d", [0.0]) * (capacity * self._counters_width)
+        self._next = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        """Return the number of samples held."""
+        return self._size
+
+    @property
+    def nbytes(self) -> int:
+        """Return the memory used by the sample storage."""
+        return sum(
+            values.itemsize * len(values)
+            for values in (self._timestamps, self._power, self._counters)
+        )
+
+    @property
+    def latest(self) -> EcocompteurValues | None:
+        """Return the most recent sample."""
+        if not self._size:
+            return None
+        return self._sample((self._next - 1) % self.capacity)
+
+    def clear(self) -> None:
+        """Drop all samples."""
+        self._next = 0
+        self._size = 0
+
+    def append(self, values: EcocompteurValues) -> bool:
+        """Add a real-time snapshot, return whether it was a new sample."""
+        timestamp = values.timestamp
+        if timestamp is None or (
+            self._size and timestamp <= self._timestamps[self._next - 1]
+        ):
+            return False
+        self._timestamps[self._next] = timestamp
+        power = values.values[: self._power_width]
+        offset = self._next * self._power_width
+        self._power[offset : offset + self._power_width] = array("f", power)
+        counters = values.values[self._power_width :]
+        offset = self._next * self._counters_width
+        self._counters[offset : offset + self._counters_width] = array("d", counters)
+        self._next = (self._next + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+        return True
+
+    def _sample(self, slot: int) -> EcocompteurValues:
+        power = slot * self._power_width
+        counters = slot * self._counters_width
+        return EcocompteurValues(
+            self._timestamps[slot],
+            (
+                *self._power[power : power + self._power_width],
+                *self._counters[counters : counters + self._counters_width],
+            ),
+        )
+
+    def _value(self, slot: int, idx: int) -> float:
+        """Return a field of a sample, by its index in SAMPLE_KEYS."""
+        if idx < self._power_width:
+            return self._power[slot * self._power_width + idx]
+        return self._counters[slot * self._counters_width + idx - self._power_width]
+
+    def _slots(self, start: float | None, end: float | None) -> Iterator[int]:
+        """Yield the slots of the samples within [start, end], oldest first."""
+        first = (self._next - self._size) % self.capacity
+        for i in range(self._size):
+            slot = (first + i) % self.capacity
+            timestamp = self._timestamps[slot]
+            if start is not None and timestamp < start:
+                continue
+            if end is not None and timestamp > end:
+                break
+            yield slot
+
+    def window(
+        self, start: float | None = None, end: float | None = None
+    ) -> list[EcocompteurValues]:
+        """Return the samples stamped within [start, end], oldest first."""
+        return [self._sample(slot) for slot in self._slots(start, end)]
+
+    def series(
+        self, key: str, start: float | None = None, end: float | None = None
+    ) -> list[tuple[int, float]]:
+        """Return the (timestamp, value) pairs of a field within [start, end]."""
+        idx = SAMPLE_INDEX[key]
+        return [
+            (self._timestamps[slot], self._value(slot, idx))
+            for slot in self._slots(start, end)
+        ]
+
+    def extent(
+        self, key: str, start: float | None = None, end: float | None = None
+    ) -> tuple[float, float, float] | None:
+        """Return the minimum, maximum and mean of a field within [start, end]."""
+        values = [value for _, value in self.series(key, start, end)]
+        if not values:
+            return None
+        return min(values), max(values), sum(values) / len(values)
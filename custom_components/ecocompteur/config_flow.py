@@ -7,11 +7,40 @@ import uuid
 from typing import Any
 
 import voluptuous as vol
-from homeassistant.config_entries import ConfigFlow, ConfigFlowResult
+from homeassistant.config_entries import (
+    ConfigEntry,
+    ConfigEntryState,
+    ConfigFlow,
+    ConfigFlowResult,
+    OptionsFlow,
+)
 from homeassistant.const import CONF_HOST, CONF_NAME
+from homeassistant.core import callback
+from homeassistant.helpers import config_validation as cv
 
-from .api import Ecocompteur, EcocompteurApiError, EcocompteurJSONDecodeError
-from .const import DEFAULT_NAME, DOMAIN
+from .api import (
+    CONNECT_TIMEOUT,
+    READ_TIMEOUT,
+    Ecocompteur,
+    EcocompteurApiError,
+    EcocompteurJSONDecodeError,
+)
+from .const import (
+    CONF_CONNECT_TIMEOUT,
+    CONF_HUB_SCHEDULING,
+    CONF_INPUTS,
+    CONF_MAX_SCAN_INTERVAL,
+    CONF_MIN_SCAN_INTERVAL,
+    CONF_READ_TIMEOUT,
+    CONF_STREAMING,
+    DEFAULT_HUB_SCHEDULING,
+    DEFAULT_MAX_SCAN_INTERVAL,
+    DEFAULT_MIN_SCAN_INTERVAL,
+    DEFAULT_NAME,
+    DEFAULT_STREAMING,
+    DOMAIN,
+)
+from .model import SAMPLE_KEYS
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -22,12 +51,49 @@ STEP_USER_DATA_SCHEMA = vol.Schema(
     }
 )
 
+# Bounds of the request timeouts, in seconds
+MIN_TIMEOUT = 0.5
+MAX_TIMEOUT = 30
+
+
+def _options_schema(input_labels: dict[str, str]) -> vol.Schema:
+    """Return the options schema, given the label of every input."""
+    return vol.Schema(
+        {
+            vol.Required(
+                CONF_MIN_SCAN_INTERVAL,
+                default=DEFAULT_MIN_SCAN_INTERVAL.total_seconds(),
+            ): vol.All(vol.Coerce(float), vol.Range(min=1)),
+            vol.Required(
+                CONF_MAX_SCAN_INTERVAL,
+                default=DEFAULT_MAX_SCAN_INTERVAL.total_seconds(),
+            ): vol.All(vol.Coerce(float), vol.Range(min=1)),
+            vol.Required(CONF_CONNECT_TIMEOUT, default=CONNECT_TIMEOUT): vol.All(
+                vol.Coerce(float), vol.Range(min=MIN_TIMEOUT, max=MAX_TIMEOUT)
+            ),
+            vol.Required(CONF_READ_TIMEOUT, default=READ_TIMEOUT): vol.All(
+                vol.Coerce(float), vol.Range(min=MIN_TIMEOUT, max=MAX_TIMEOUT)
+            ),
+            vol.Required(CONF_INPUTS, default=list(SAMPLE_KEYS)): cv.multi_select(
+                input_labels
+            ),
+            vol.Required(CONF_STREAMING, default=DEFAULT_STREAMING): bool,
+            vol.Required(CONF_HUB_SCHEDULING, default=DEFAULT_HUB_SCHEDULING): bool,
+        }
+    )
+
 
 class EcocompteurConfigFlow(ConfigFlow, domain=DOMAIN):
     """Handle a config flow for Ecocompteur."""
 
     VERSION = 2
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry: ConfigEntry) -> EcocompteurOptionsFlow:  # noqa: ARG004
+        """Get the options flow for this handler."""
+        return EcocompteurOptionsFlow()
+
     async def async_step_user(
         self, user_input: dict[str, Any] | None = None
     ) -> ConfigFlowResult:
@@ -43,6 +109,7 @@ class EcocompteurConfigFlow(ConfigFlow, domain=DOMAIN):
             await self.async_set_unique_id(unique_id)
             self._abort_if_unique_id_configured()
 
+            # The config entry then reuses the connections to the device
             client = Ecocompteur(self.hass, host)
             try:
                 await client.fetch_data()
@@ -60,3 +127,39 @@ class EcocompteurConfigFlow(ConfigFlow, domain=DOMAIN):
         return self.async_show_form(
             step_id="user", data_schema=STEP_USER_DATA_SCHEMA, errors=errors
         )
+
+
+class EcocompteurOptionsFlow(OptionsFlow):
+    """Handle Ecocompteur options."""
+
+    async def async_step_init(
+        self, user_input: dict[str, Any] | None = None
+    ) -> ConfigFlowResult:
+        """Manage the options."""
+        errors: dict[str, str] = {}
+
+        if user_input is not None:
+            if user_input[CONF_MIN_SCAN_INTERVAL] > user_input[CONF_MAX_SCAN_INTERVAL]:
+                errors["base"] = "invalid_scan_interval"
+            elif user_input[CONF_STREAMING] and user_input[CONF_HUB_SCHEDULING]:
+                errors["base"] = "streaming_with_hub_scheduling"
+            else:
+                return self.async_create_entry(data=user_input)
+
+        return self.async_show_form(
+            step_id="init",
+            data_schema=self.add_suggested_values_to_schema(
+                _options_schema(self._input_labels()),
+                user_input or self.config_entry.options,
+            ),
+            errors=errors,
+        )
+
+    def _input_labels(self) -> dict[str, str]:
+        """Return the label of every input, as known while the entry is loaded."""
+        labels = dict(zip(SAMPLE_KEYS, SAMPLE_KEYS, strict=True))
+        if self.config_entry.state is ConfigEntryState.LOADED:
+            config = self.config_entry.runtime_data.coordinator.config_coordinator.data
+            for key, config_input in zip(SAMPLE_KEYS, config.inputs, strict=False):
+                labels[key] = f"{config_input.label} ({key})"
+        return labels
@@ -9,4 +9,23 @@ DEFAULT_NAME = "Ecocompteur"
 
 ATTR_CONFIG_ENTRY_ID = "entry_id"
 
+# Fired when the power of a circuit leaves its learned band
+EVENT_ANOMALY = f"{DOMAIN}_anomaly"
+
+CONF_MIN_SCAN_INTERVAL = "min_scan_interval"
+CONF_MAX_SCAN_INTERVAL = "max_scan_interval"
+CONF_STREAMING = "streaming"
+CONF_HUB_SCHEDULING = "hub_scheduling"
+CONF_CONNECT_TIMEOUT = "connect_timeout"
+CONF_READ_TIMEOUT = "read_timeout"
+CONF_INPUTS = "inputs"
+
+# inst.json fields holding the power drawn by each circuit
+POWER_KEYS = ("data1", "data2", "data3", "data4", "data5")
+
 DEFAULT_SCAN_INTERVAL = timedelta(seconds=5)
+DEFAULT_MIN_SCAN_INTERVAL = timedelta(seconds=2)
+DEFAULT_MAX_SCAN_INTERVAL = timedelta(seconds=60)
+DEFAULT_CONFIG_SCAN_INTERVAL = timedelta(minutes=1)
+DEFAULT_STREAMING = False
+DEFAULT_HUB_SCHEDULING = False
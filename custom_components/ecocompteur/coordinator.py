@@ -1,50 +1,492 @@
-"""Coordinator for Ecocompteur ventilation units."""
+"""Coordinators for Ecocompteur energy monitors."""
 
 import logging
+from collections.abc import Iterable
+from datetime import timedelta
+from time import monotonic, perf_counter
 from typing import Any
 
-from homeassistant.core import HomeAssistant
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.util import dt as dt_util
 
+from .anomaly import EcocompteurAnomalyDetector
 from .api import Ecocompteur, EcocompteurApiError, EcocompteurJSONDecodeError
-from .const import DEFAULT_SCAN_INTERVAL
+from .buffer import EcocompteurSampleBuffer, buffer_capacity
+from .const import (
+    DEFAULT_CONFIG_SCAN_INTERVAL,
+    DEFAULT_MAX_SCAN_INTERVAL,
+    DEFAULT_MIN_SCAN_INTERVAL,
+    DEFAULT_SCAN_INTERVAL,
+    DOMAIN,
+    EVENT_ANOMALY,
+)
+from .energy import ENERGY_KEYS, EcocompteurEnergyIntegrator
+from .flow import FLOW_KEYS, ROLLING_FLOW_KEYS, EcocompteurFlowMeter
+from .metrics import STAGE_DISPATCH
+from .model import CONSO_KEYS, SAMPLE_KEYS, EcocompteurConfig, EcocompteurValues
+from .rollup import EcocompteurRollups
+from .scheduler import EcocompteurScheduler
+from .tariff import EcocompteurTariffAccounting
 
 _LOGGER = logging.getLogger(__name__)
 
+_UNSET = object()
 
-class EcocompteurDataUpdateCoordinator(DataUpdateCoordinator[dict[str, Any]]):
-    """The DataUpdateCoordinator for Ecocompteur."""
+STORAGE_VERSION = 1
+
+# Energy totals, per tariff period too, and the last known values are written
+# to disk at most this often (in seconds). Pending writes also happen when
+# Home Assistant stops.
+SAVE_DELAY = 60
+
+_ENERGY_INDEX = {key: idx for idx, key in enumerate(ENERGY_KEYS)}
+_FLOW_INDEX = {key: idx for idx, key in enumerate(FLOW_KEYS)}
+_ROLLING_FLOW_INDEX = {key: idx for idx, key in enumerate(ROLLING_FLOW_KEYS)}
+
+# Context of the listeners depending on the active tariff period
+TARIFF_PERIOD_CONTEXT = "tariff_period"
+
+# First item of the (ANOMALY_CONTEXT, circuit) contexts of the listeners
+# depending on whether the power of a circuit is abnormal
+ANOMALY_CONTEXT = "anomaly"
+
+# First item of the (ROLLUP_CONTEXT, period, series) contexts of the
+# listeners depending on the latest bucket of a series
+ROLLUP_CONTEXT = "rollup"
+
+
+class EcocompteurCoordinator[DataT: (EcocompteurConfig, EcocompteurValues)](
+    DataUpdateCoordinator[DataT]
+):
+    """
+    Base DataUpdateCoordinator for Ecocompteur.
+
+    Entities subscribe with their key as context. On every update, the value
+    behind each context is compared with the one last pushed to its listener,
+    and only listeners whose value changed are called. All listeners are
+    called when availability changes or when `_async_force_update` says so.
+    Data are immutable snapshots: when a snapshot equals the last one pushed,
+    no value is looked up at all.
+    """
 
     def __init__(
         self,
         hass: HomeAssistant,
+        config_entry: ConfigEntry,
         name: str,
         client: Ecocompteur,
+        update_interval: timedelta,
     ) -> None:
-        """Initialize Ecocompteur data coordinator."""
+        """Initialize Ecocompteur coordinator."""
         super().__init__(
             hass,
             _LOGGER,
-            name=f"{name} DataUpdateCoordinator",
-            update_interval=DEFAULT_SCAN_INTERVAL,
+            config_entry=config_entry,
+            name=f"{config_entry.entry_id} {name}",
+            update_interval=update_interval,
             always_update=False,
         )
         self.client = client
+        self.skipped_updates = 0
+        self._notified_states: dict[int, Any] = {}
+        self._notified_success = True
+        self._notified_data: DataT | None = None
 
-    async def _async_setup(self) -> None:
-        """Set up the coordinator."""
-        self.data = await self._async_update_data()
-
-    async def _async_update_data(self) -> dict[str, Any]:
+    async def _async_update_data(self) -> DataT:
         """Fetch state update."""
         try:
-            return {
-                "config": await self.client.fetch_data(),
-                "values": await self.client.fetch_inst(),
-            }
+            return await self._async_fetch()
         except EcocompteurApiError as err:
             msg = "Error communicating with Ecocompteur"
             raise UpdateFailed(msg) from err
         except EcocompteurJSONDecodeError as err:
             msg = "Error decoding Ecocompteur JSON response"
             raise UpdateFailed(msg) from err
+
+    async def _async_fetch(self) -> DataT:
+        """Fetch data from the device."""
+        raise NotImplementedError
+
+    def _context_state(self, context: Any) -> Any:
+        """Return the value a listener subscribed with context depends on."""
+        raise NotImplementedError
+
+    def _async_force_update(self) -> bool:
+        """Return whether all listeners must be called."""
+        return False
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """Call the listeners whose value changed since their last call."""
+        start = perf_counter()
+        force = (
+            self._notified_success != self.last_update_success
+            or not self.last_update_success
+            or self._async_force_update()
+        )
+        self._notified_success = self.last_update_success
+
+        if not force and self.data == self._notified_data:
+            for update_callback, context in list(self._listeners.values()):
+                if context is None:
+                    update_callback()
+                else:
+                    self.skipped_updates += 1
+            self.client.metrics.record(STAGE_DISPATCH, start)
+            return
+        self._notified_data = self.data
+
+        notified_states: dict[int, Any] = {}
+        for listener_id, (update_callback, context) in list(self._listeners.items()):
+            if context is None:
+                update_callback()
+                continue
+            state = self._context_state(context)
+            notified_states[listener_id] = state
+            if not force and self._notified_states.get(listener_id, _UNSET) == state:
+                self.skipped_updates += 1
+                continue
+            update_callback()
+        self._notified_states = notified_states
+        self.client.metrics.record(STAGE_DISPATCH, start)
+
+
+class EcocompteurConfigUpdateCoordinator(EcocompteurCoordinator[EcocompteurConfig]):
+    """
+    The DataUpdateCoordinator for Ecocompteur configuration and TIC counters.
+
+    Labels, tariff option, input types and disabled flags almost never change,
+    and the TIC counters move slowly, so data.json is polled at a much lower
+    rate than the real-time values.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        config_entry: ConfigEntry,
+        client: Ecocompteur,
+    ) -> None:
+        """Initialize Ecocompteur config coordinator."""
+        super().__init__(
+            hass,
+            config_entry,
+            "ConfigUpdateCoordinator",
+            client,
+            DEFAULT_CONFIG_SCAN_INTERVAL,
+        )
+
+    async def _async_fetch(self) -> EcocompteurConfig:
+        """Fetch configuration update."""
+        return await self.client.fetch_data()
+
+    def _context_state(self, context: Any) -> Any:
+        """Return the TIC counter a listener depends on."""
+        return self.data.counter(context)
+
+
+class EcocompteurDataUpdateCoordinator(EcocompteurCoordinator[EcocompteurValues]):
+    """
+    The DataUpdateCoordinator for Ecocompteur real-time values.
+
+    The polling interval is adapted after every refresh by an
+    EcocompteurScheduler, from the device latency and power volatility. In
+    streaming mode or with hub scheduling, the coordinator doesn't schedule
+    refreshes itself: an EcocompteurStreamer or the EcocompteurHub pushes
+    the values instead.
+    Every new sample is also kept, stamped with the device time, in a ring
+    buffer that downstream consumers can read windows of, and integrated into
+    the energy drawn by each circuit, in total and per tariff period. Flow
+    rates are derived from the pulse counters. TIC counters and log2.csv
+    totals are rolled up per day, month and year.
+    The power of each circuit is checked against its learned band, and an
+    event is fired when it leaves it.
+    The last known configuration and values are cached on disk, so that
+    entities can be set up right away on the next start.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        hass: HomeAssistant,
+        config_entry: ConfigEntry,
+        client: Ecocompteur,
+        config_coordinator: EcocompteurConfigUpdateCoordinator,
+        min_interval: timedelta = DEFAULT_MIN_SCAN_INTERVAL,
+        max_interval: timedelta = DEFAULT_MAX_SCAN_INTERVAL,
+    ) -> None:
+        """Initialize Ecocompteur data coordinator."""
+        self.scheduler = EcocompteurScheduler(
+            DEFAULT_SCAN_INTERVAL, min_interval, max_interval
+        )
+        super().__init__(
+            hass,
+            config_entry,
+            "DataUpdateCoordinator",
+            client,
+            self.scheduler.interval,
+        )
+        self.config_coordinator = config_coordinator
+        self.samples = EcocompteurSampleBuffer(
+            buffer_capacity(len(hass.config_entries.async_entries(DOMAIN)))
+        )
+        self.energy = EcocompteurEnergyIntegrator()
+        self._energy_store: Store[dict[str, Any]] = Store(
+            hass, STORAGE_VERSION, f"{DOMAIN}.{config_entry.entry_id}.energy"
+        )
+        self.tariffs = EcocompteurTariffAccounting()
+        self._tariffs_store: Store[dict[str, Any]] = Store(
+            hass, STORAGE_VERSION, f"{DOMAIN}.{config_entry.entry_id}.tariffs"
+        )
+        self.rollups = EcocompteurRollups()
+        self._rollups_store: Store[dict[str, Any]] = Store(
+            hass, STORAGE_VERSION, f"{DOMAIN}.{config_entry.entry_id}.rollups"
+        )
+        self.flows = EcocompteurFlowMeter()
+        self.anomalies = EcocompteurAnomalyDetector()
+        self._anomalies_store: Store[dict[str, Any]] = Store(
+            hass, STORAGE_VERSION, f"{DOMAIN}.{config_entry.entry_id}.anomalies"
+        )
+        self._accounted_config: EcocompteurConfig | None = None
+        self._cache_store: Store[dict[str, Any]] = Store(
+            hass, STORAGE_VERSION, f"{DOMAIN}.{config_entry.entry_id}.cache"
+        )
+        self._save_at = 0.0
+        # Latest log2.csv day rolled up when the rollups were last saved
+        self._saved_log_day: str | None = None
+        self._notified_config: EcocompteurConfig | None = None
+        # Cleared when a streamer or the hub drives the refreshes instead
+        self.polling = True
+        # Indexes, in SAMPLE_KEYS order, of the inputs enabled in the options
+        self.enabled_inputs = frozenset(range(len(SAMPLE_KEYS)))
+
+    async def async_restore(self) -> bool:
+        """
+        Restore the energy totals and the last known values.
+
+        Return whether the configuration and values of the device were
+        restored. They are then the data of the coordinators until the first
+        refresh, and the entities can be set up without waiting for the device.
+        """
+        self.energy = EcocompteurEnergyIntegrator.from_dict(
+            await self._energy_store.async_load()
+        )
+        self.tariffs = EcocompteurTariffAccounting.from_dict(
+            await self._tariffs_store.async_load()
+        )
+        self.rollups = EcocompteurRollups.from_dict(
+            await self._rollups_store.async_load()
+        )
+        self._saved_log_day = self.rollups.log_day
+        self.anomalies = EcocompteurAnomalyDetector.from_dict(
+            await self._anomalies_store.async_load()
+        )
+        cache = await self._cache_store.async_load()
+        if not cache or cache["config"] is None or cache["values"] is None:
+            return False
+        self.config_coordinator.data = EcocompteurConfig.from_dict(cache["config"])
+        self.data = EcocompteurValues.from_dict(cache["values"])
+        return True
+
+    async def async_refresh_restored(self) -> None:
+        """Refresh the values restored from the cache."""
+        await self.config_coordinator.async_refresh()
+        # Otherwise the streamer or the hub fetches the values soon enough
+        if self.polling:
+            await self.async_refresh()
+
+    async def async_shutdown(self) -> None:
+        """Save the energy totals and the last values, and stop polling."""
+        await super().async_shutdown()
+        await self._energy_store.async_save(self.energy.as_dict())
+        await self._tariffs_store.async_save(self.tariffs.as_dict())
+        await self._rollups_store.async_save(self.rollups.as_dict())
+        await self._anomalies_store.async_save(self.anomalies.as_dict())
+        if self.data is not None:
+            await self._cache_store.async_save(self._cache_data())
+
+    def _cache_data(self) -> dict[str, Any]:
+        """Return the last known configuration and values."""
+        return {
+            "config": self.config_coordinator.data.as_dict(),
+            "values": self.data.as_dict(),
+        }
+
+    @callback
+    def _async_save(self) -> None:
+        """Schedule a write of the energy totals and the last values."""
+        # Keep a save pending at all times, so that the totals are written
+        # on stop, but only move its deadline forward once it has passed:
+        # a new sample every few seconds must not postpone it forever.
+        now = self.hass.loop.time()
+        if self._save_at <= now:
+            self._save_at = now + SAVE_DELAY
+        self._energy_store.async_delay_save(self.energy.as_dict, self._save_at - now)
+        self._tariffs_store.async_delay_save(self.tariffs.as_dict, self._save_at - now)
+        self._rollups_store.async_delay_save(self.rollups.as_dict, self._save_at - now)
+        self._anomalies_store.async_delay_save(
+            self.anomalies.as_dict, self._save_at - now
+        )
+        self._cache_store.async_delay_save(self._cache_data, self._save_at - now)
+
+    async def _async_update_data(self) -> EcocompteurValues:
+        """Fetch state update and adapt the polling interval."""
+        start = monotonic()
+        try:
+            data = await super()._async_update_data()
+        except UpdateFailed:
+            interval = self.scheduler.failure()
+            if self.polling:
+                self.update_interval = interval
+            raise
+        interval = self.scheduler.success(monotonic() - start, data.power)
+        if self.polling:
+            self.update_interval = interval
+        self.async_add_sample(data)
+        return data
+
+    @callback
+    def async_disable_polling(self) -> None:
+        """Stop scheduling refreshes, values are pushed from elsewhere."""
+        self.polling = False
+        self.update_interval = None
+
+    async def async_set_scan_intervals(
+        self, min_interval: timedelta, max_interval: timedelta
+    ) -> None:
+        """Change the bounds of the polling interval, from the next refresh on."""
+        self.scheduler.set_bounds(min_interval, max_interval)
+        if self.polling:
+            # Refresh now rather than at the end of the previous interval,
+            # which may be much longer than the new maximum
+            self.update_interval = self.scheduler.interval
+            await self.async_request_refresh()
+
+    @property
+    def active_inputs(self) -> frozenset[int]:
+        """Return the enabled inputs, less those disabled on the device."""
+        inputs = self.config_coordinator.data.inputs
+        return frozenset(idx for idx in self.enabled_inputs if not inputs[idx].disabled)
+
+    @callback
+    def async_set_enabled_inputs(self, inputs: Iterable[int]) -> None:
+        """Change the inputs enabled in the options, and tell the listeners."""
+        inputs = frozenset(inputs)
+        if inputs == self.enabled_inputs:
+            return
+        self.enabled_inputs = inputs
+        self.async_update_listeners()
+
+    @callback
+    def async_config_updated(self) -> None:
+        """Tell the listeners about a new configuration, without waiting for values."""
+        if self.data is not None:
+            self.async_update_listeners()
+
+    async def async_fetch_update(self) -> EcocompteurValues:
+        """Fetch real-time values without notifying the listeners."""
+        return await self._async_update_data()
+
+    @callback
+    def async_add_sample(self, data: EcocompteurValues) -> None:
+        """Record a new inst.json sample and integrate its power."""
+        if not self.samples.append(data):
+            latest = self.samples.latest
+            if data.timestamp is None or data.timestamp == latest.timestamp:
+                return
+            # The device clock was set back. Older samples would no longer
+            # sort, and the integrators follow the clock from there.
+            self.samples.clear()
+            self.samples.append(data)
+        day = (
+            dt_util.as_local(dt_util.utc_from_timestamp(data.timestamp))
+            .date()
+            .isoformat()
+        )
+        config = self.config_coordinator.data
+        if config is not self._accounted_config:
+            self.tariffs.update_config(config, self._accounted_config)
+            self.rollups.add_counters(day, zip(CONSO_KEYS, config.conso, strict=True))
+            self._accounted_config = config
+        if (energy := self.energy.add(data.timestamp, data.power)) is not None:
+            self.tariffs.add(day, energy)
+        self.flows.add(data.timestamp, data.counters)
+        for circuit in self.anomalies.update(data.timestamp, data.power):
+            if circuit in self.active_inputs:
+                self._async_fire_anomaly(circuit, data.power[circuit])
+        self._async_save()
+
+    @callback
+    def _async_fire_anomaly(self, circuit: int, power: float) -> None:
+        """Fire an event for a circuit whose power turned abnormal."""
+        low, high = self.anomalies.band(circuit)
+        self.hass.bus.async_fire(
+            EVENT_ANOMALY,
+            {
+                "config_entry_id": self.config_entry.entry_id,
+                "circuit": circuit + 1,
+                "label": self.config_coordinator.data.inputs[circuit].label,
+                "power": power,
+                "mean": self.anomalies.mean[circuit],
+                "low": max(low, 0.0),
+                "high": high,
+            },
+        )
+
+    @callback
+    def async_add_log_totals(self, day: str, totals: dict[str, float]) -> None:
+        """Roll up the totals of a log2.csv row, see async_log_totals_done."""
+        self.rollups.add_log_totals(day, totals)
+
+    @callback
+    def async_log_totals_done(self) -> None:
+        """Save the log2.csv rows rolled up since the last call, and notify."""
+        if self.rollups.log_day == self._saved_log_day:
+            return
+        self._saved_log_day = self.rollups.log_day
+        self._async_save()
+        if self.data is not None:
+            # Values didn't change, look the rollups up anyway
+            self._notified_data = None
+            self.async_update_listeners()
+
+    async def _async_fetch(self) -> EcocompteurValues:
+        """Fetch real-time values."""
+        if self.config_coordinator.data is None:
+            # Nothing known about the device yet: fetch both at once
+            # and hand the configuration over to its coordinator.
+            config, values = await self.client.fetch_all()
+            self.config_coordinator.async_set_updated_data(config)
+            return values
+        return await self.client.fetch_inst()
+
+    def _context_state(self, context: Any) -> Any:  # noqa: PLR0911
+        """Return the real-time value a listener depends on."""
+        if (idx := _ENERGY_INDEX.get(context)) is not None:
+            return self.energy.totals[idx]
+        if (idx := _FLOW_INDEX.get(context)) is not None:
+            return self.flows.rates[idx]
+        if (idx := _ROLLING_FLOW_INDEX.get(context)) is not None:
+            return self.flows.rolling_rates[idx]
+        if context == TARIFF_PERIOD_CONTEXT:
+            config = self.config_coordinator.data
+            return (self.tariffs.period, config.option_tarifaire, config.tarif_courant)
+        if isinstance(context, tuple):
+            if context[0] == ROLLUP_CONTEXT:
+                return self.rollups.latest(context[1], context[2])
+            if context[0] == ANOMALY_CONTEXT:
+                return self.anomalies.abnormal[context[1]]
+            # Energy of a circuit during a tariff period, in total and today
+            return self.tariffs.total(*context), self.tariffs.today(*context)
+        return self.data.get(context)
+
+    def _async_force_update(self) -> bool:
+        """Call all listeners when labels or disabled flags changed."""
+        config = self.config_coordinator.data
+        if config is self._notified_config:
+            return False
+        # TIC counters don't matter to these listeners
+        changed = "inputs" in config.diff(self._notified_config)
+        self._notified_config = config
+        return changed
@@ -0,0 +1,74 @@
+"""Energy integration of the Ecocompteur circuit power readings."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
+
+from .const import POWER_KEYS
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+# Samples further apart than this (in seconds) are not integrated: the power
+# drawn during an outage is unknown, and is backfilled from the device logs.
+MAX_INTEGRATION_GAP = 300
+
+ENERGY_KEYS = tuple(f"{key}_energy" for key in POWER_KEYS)
+
+
+class EcocompteurEnergyIntegrator:
+    """
+    Integrate the power of every circuit into energy.
+
+    Power samples are integrated with the trapezoidal rule, using the device
+    time (Date_Time) for the elapsed time between samples. Totals are in Wh.
+    """
+
+    def __init__(
+        self,
+        totals: Sequence[float] | None = None,
+        timestamp: int | None = None,
+        power: Sequence[float] | None = None,
+    ) -> None:
+        """Initialize the integrator."""
+        self.totals = list(totals) if totals else [0.0] * len(POWER_KEYS)
+        self._timestamp = timestamp
+        self._power = power
+
+    def add(self, timestamp: int, power: Sequence[float]) -> list[float] | None:
+        """
+        Integrate the power drawn since the previous sample.
+
+        Return the energy drawn by every circuit, or None when nothing was
+        integrated.
+        """
+        energy = None
+        if self._timestamp is not None and self._power is not None:
+            elapsed = timestamp - self._timestamp
+            if elapsed == 0:
+                return None
+            if 0 < elapsed <= MAX_INTEGRATION_GAP:
+                energy = [
+                    (previous + current) * elapsed / 7200
+                    for previous, current in zip(self._power, power, strict=True)
+                ]
+                for idx, value in enumerate(energy):
+                    self.totals[idx] += value
+        self._timestamp = timestamp
+        self._power = power
+        return energy
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the integrator state to persist."""
+        return {
+            "totals": self.totals,
+            "timestamp": self._timestamp,
+            "power": self._power,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any] | None) -> EcocompteurEnergyIntegrator:
+        """Restore an integrator from its persisted state."""
+        if not data:
+            return cls()
+        return cls(data["totals"], data["timestamp"], data["power"])
@@ -0,0 +1,73 @@
+"""Entity helpers shared by the Ecocompteur platforms."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import entity_registry as er
+
+from .const import DOMAIN
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable, Mapping
+
+    from homeassistant.helpers.entity import Entity
+    from homeassistant.helpers.entity_platform import AddEntitiesCallback
+
+
+class EcocompteurEntityManager:
+    """
+    Add and remove the entities of a platform as the inputs they track come and go.
+
+    Entities are identified by their unique ID. Those no longer wanted are
+    removed along with their registry entries, so that they don't cost any
+    state write or registry entry. On the first sync, registry entries left
+    over by a previous run among the candidates are removed too.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        config_entry_id: str,
+        platform_domain: str,
+        async_add_entities: AddEntitiesCallback,
+        candidates: Iterable[str],
+    ) -> None:
+        """Initialize the manager."""
+        self._hass = hass
+        self._config_entry_id = config_entry_id
+        self._platform_domain = platform_domain
+        self._async_add_entities = async_add_entities
+        self._candidates: set[str] | None = set(candidates)
+        self._unique_ids: set[str] = set()
+
+    @callback
+    def async_sync(self, wanted: Mapping[str, Callable[[], Entity]]) -> None:
+        """Add the wanted entities missing, given their factories, remove the others."""
+        registry = er.async_get(self._hass)
+        unwanted = self._unique_ids - wanted.keys()
+        if self._candidates is not None:
+            unwanted |= {
+                entry.unique_id
+                for entry in er.async_entries_for_config_entry(
+                    registry, self._config_entry_id
+                )
+                if entry.domain == self._platform_domain
+                and entry.unique_id in self._candidates
+                and entry.unique_id not in wanted
+            }
+            self._candidates = None
+        for unique_id in unwanted:
+            self._unique_ids.discard(unique_id)
+            # Removing the registry entry removes the entity as well
+            if entity_id := registry.async_get_entity_id(
+                self._platform_domain, DOMAIN, unique_id
+            ):
+                registry.async_remove(entity_id)
+
+        if added := wanted.keys() - self._unique_ids:
+            self._unique_ids.update(added)
+            self._async_add_entities(
+                factory() for unique_id, factory in wanted.items() if unique_id in added
+            )
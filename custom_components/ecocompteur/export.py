@@ -0,0 +1,63 @@
+"""CSV export files of Ecocompteur data."""
+
+from __future__ import annotations
+
+import csv
+import gzip
+from datetime import UTC, datetime
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+    from pathlib import Path
+
+EXPORT_SUFFIX = ".csv.gz"
+
+# Rows written at once. Also the number of rows held in memory while
+# exporting, per table.
+WRITE_BATCH_SIZE = 4096
+
+TIME_COLUMN = "time"
+
+# Fast enough to keep up with a device log, still about 4 times smaller
+COMPRESS_LEVEL = 6
+
+
+class EcocompteurExportWriter:
+    """
+    Write a table of timestamped values to a gzip-compressed CSV file.
+
+    The first column, TIME_COLUMN, holds the time of every row in ISO 8601,
+    in UTC. The other columns hold the values, under the names of the device
+    fields. Spreadsheets, pandas.read_csv and zcat read such files as they
+    are. Rows are written in batches as they come in, so that a table of any
+    length is exported with bounded memory. File I/O is blocking, so the
+    writer must be used from an executor.
+    """
+
+    def __init__(self, path: Path, columns: Sequence[str]) -> None:
+        """Create the file and write the header."""
+        self.path = path
+        self.rows = 0
+        self._file = gzip.open(  # noqa: SIM115
+            path, "wt", encoding="utf-8", newline="", compresslevel=COMPRESS_LEVEL
+        )
+        self._writer = csv.writer(self._file)
+        self._writer.writerow([TIME_COLUMN, *columns])
+
+    def write(self, rows: Sequence[tuple[int, Sequence[float]]]) -> None:
+        """Write (timestamp, values) rows, timestamps in seconds since the epoch."""
+        self._writer.writerows(
+            [datetime.fromtimestamp(timestamp, UTC).isoformat(), *values]
+            for timestamp, values in rows
+        )
+        self.rows += len(rows)
+
+    def close(self) -> None:
+        """Close the file."""
+        self._file.close()
+
+    def abort(self) -> None:
+        """Close and remove the incomplete file."""
+        self._file.close()
+        self.path.unlink(missing_ok=True)
@@ -0,0 +1,117 @@
+"""Flow rates of the Ecocompteur pulse counters."""
+
+from __future__ import annotations
+
+from collections import deque
+from typing import TYPE_CHECKING
+
+from .const import POWER_KEYS
+from .energy import MAX_INTEGRATION_GAP
+from .model import SAMPLE_KEYS
+from .rollup import RESET_RATIO
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+# Pulse counters of inst.json, water and gas volumes in m³
+COUNTER_KEYS = SAMPLE_KEYS[len(POWER_KEYS) :]
+
+FLOW_KEYS = tuple(f"{key}_flow" for key in COUNTER_KEYS)
+ROLLING_FLOW_KEYS = tuple(f"{key}_rolling_flow" for key in COUNTER_KEYS)
+
+# Seconds of device time the rolling flow rates are averaged over
+ROLLING_WINDOW = 300
+
+# Samples further apart than this (in seconds) give no instantaneous rate:
+# the volume drawn during an outage says little about the current flow.
+MAX_FLOW_GAP = MAX_INTEGRATION_GAP
+
+
+class EcocompteurFlowMeter:
+    """
+    Derive flow rates from the cumulative pulse counters.
+
+    The volume drawn between two readings of a counter is its increase, or
+    its new value when it dropped below RESET_RATIO of the last one: it was
+    reset, or wrapped around, and counted up from zero since. Smaller drops
+    are reading glitches, with no volume drawn, and the counter goes on from
+    its last value. Zero readings, e.g. of fields missing from inst.json, are
+    skipped. Elapsed times are those of the device clock (Date_Time), so that
+    polling delays don't skew the rates.
+
+    The instantaneous rate, in L/min, is the volume drawn since the previous
+    reading over the time elapsed. At short polling intervals, it jumps
+    between zero and a pulse per interval. The rolling rate, in m³/h, is the
+    volume drawn over the last ROLLING_WINDOW seconds. Rates are None until
+    known.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the flow meter."""
+        self.rates: list[float | None] = [None] * len(COUNTER_KEYS)
+        self.rolling_rates: list[float | None] = [None] * len(COUNTER_KEYS)
+        self._timestamp: int | None = None
+        # Last reading of every counter, and its time
+        self._counters: list[float | None] = [None] * len(COUNTER_KEYS)
+        self._times: list[int | None] = [None] * len(COUNTER_KEYS)
+        # Volume drawn since start, resets excluded, and its value at every
+        # sample of the rolling window
+        self._volumes = [0.0] * len(COUNTER_KEYS)
+        self._window: deque[tuple[int, list[float]]] = deque()
+
+    def add(self, timestamp: int, counters: Sequence[float]) -> None:
+        """Update the flow rates from a new sample of the counters."""
+        previous = self._timestamp
+        if previous is not None and timestamp <= previous:
+            if timestamp < previous:
+                # The device clock was set back: measure again from there
+                self.rates = [None] * len(COUNTER_KEYS)
+                self.rolling_rates = [None] * len(COUNTER_KEYS)
+                self._times = [None] * len(COUNTER_KEYS)
+                self._window.clear()
+                self._timestamp = timestamp
+            return
+        self._timestamp = timestamp
+        for idx, current in enumerate(counters):
+            last = self._counters[idx]
+            if not current:
+                if last is None and previous is not None:
+                    # Nothing counted yet
+                    self.rates[idx] = 0.0
+                continue
+            since = self._times[idx]
+            self._times[idx] = timestamp
+            if last is None:
+                self._counters[idx] = current
+                continue
+            if current >= last:
+                volume = current - last
+                self._counters[idx] = current
+            elif current < last * RESET_RATIO:
+                # Counted up from zero since the reset
+                volume = current
+                self._counters[idx] = current
+            else:
+                # A glitch, the counter goes on from its last value
+                volume = 0.0
+            if since is None:
+                # First reading since the device clock was set back
+                continue
+            self._volumes[idx] += volume
+            elapsed = timestamp - since
+            self.rates[idx] = (
+                volume * 60000 / elapsed if elapsed <= MAX_FLOW_GAP else None
+            )
+
+        window = self._window
+        window.append((timestamp, list(self._volumes)))
+        while window[0][0] < timestamp - ROLLING_WINDOW:
+            window.popleft()
+        start, volumes = window[0]
+        if start == timestamp:
+            self.rolling_rates = [None] * len(COUNTER_KEYS)
+            return
+        self.rolling_rates = [
+            (current - volume) * 3600 / (timestamp - start)
+            for current, volume in zip(self._volumes, volumes, strict=True)
+        ]
@@ -0,0 +1,172 @@
+"""Shared polling schedule for installations with many Ecocompteurs."""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import logging
+from typing import TYPE_CHECKING
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.update_coordinator import UpdateFailed
+from homeassistant.util.hass_dict import HassKey
+
+from .const import DEFAULT_SCAN_INTERVAL, DOMAIN
+
+if TYPE_CHECKING:
+    from .coordinator import EcocompteurDataUpdateCoordinator
+    from .model import EcocompteurValues
+
+_LOGGER = logging.getLogger(__name__)
+
+DATA_HUB: HassKey[EcocompteurHub] = HassKey(f"{DOMAIN}_hub")
+
+# Polls running at once across all devices
+HUB_MAX_CONCURRENT_POLLS = 4
+
+# Results are handed to the entities in one batch at most this often (s)
+HUB_FLUSH_DELAY = 0.5
+
+
+@callback
+def async_get_hub(hass: HomeAssistant) -> EcocompteurHub:
+    """Return the hub, creating it on first use."""
+    if (hub := hass.data.get(DATA_HUB)) is None:
+        hub = hass.data[DATA_HUB] = EcocompteurHub(hass)
+    return hub
+
+
+class EcocompteurHub:
+    """
+    Poll the real-time values of several Ecocompteurs on one schedule.
+
+    A single task starts every poll. Poll starts are spaced by the base
+    interval divided by the number of devices, so that requests are spread
+    evenly instead of coming in bursts, and a semaphore caps the polls
+    running at once. Each device's own scheduler still decides when it is
+    due. Results are collected and handed to the coordinators in a single
+    callback per flush delay, rather than one wakeup per device.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the hub."""
+        self.hass = hass
+        self._semaphore = asyncio.Semaphore(HUB_MAX_CONCURRENT_POLLS)
+        self._coordinators: set[EcocompteurDataUpdateCoordinator] = set()
+        # (due time, tie-breaker, coordinator)
+        self._queue: list[tuple[float, int, EcocompteurDataUpdateCoordinator]] = []
+        self._counter = itertools.count()
+        self._queued = asyncio.Event()
+        self._polls: dict[EcocompteurDataUpdateCoordinator, asyncio.Task[None]] = {}
+        self._results: dict[
+            EcocompteurDataUpdateCoordinator, EcocompteurValues | UpdateFailed
+        ] = {}
+        self._task: asyncio.Task[None] | None = None
+        self._flush_handle: asyncio.TimerHandle | None = None
+        self._last_start = 0.0
+
+    @callback
+    def async_register(
+        self, coordinator: EcocompteurDataUpdateCoordinator
+    ) -> CALLBACK_TYPE:
+        """Add a coordinator to the schedule, return a callback removing it."""
+        coordinator.async_disable_polling()
+        self._coordinators.add(coordinator)
+        self._async_enqueue(
+            coordinator,
+            self.hass.loop.time() + coordinator.scheduler.interval.total_seconds(),
+        )
+        if self._task is None:
+            self._task = self.hass.async_create_background_task(
+                self._async_run(), f"{DOMAIN} hub"
+            )
+
+        @callback
+        def _async_unregister() -> None:
+            self._coordinators.discard(coordinator)
+            self._results.pop(coordinator, None)
+            if (poll := self._polls.pop(coordinator, None)) is not None:
+                poll.cancel()
+            if not self._coordinators:
+                self._async_stop()
+
+        return _async_unregister
+
+    @callback
+    def _async_stop(self) -> None:
+        """Stop scheduling once no device is left."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        self._queue.clear()
+
+    @callback
+    def _async_enqueue(
+        self, coordinator: EcocompteurDataUpdateCoordinator, due: float
+    ) -> None:
+        heapq.heappush(self._queue, (due, next(self._counter), coordinator))
+        self._queued.set()
+
+    async def _async_run(self) -> None:
+        """Start the polls as they become due."""
+        loop = self.hass.loop
+        while True:
+            if not self._queue:
+                # Every device is being polled
+                self._queued.clear()
+                await self._queued.wait()
+                continue
+            due, _, coordinator = self._queue[0]
+            spacing = DEFAULT_SCAN_INTERVAL.total_seconds() / len(self._coordinators)
+            start = max(due, self._last_start + spacing)
+            if (delay := start - loop.time()) > 0:
+                # Wake up again rather than sleeping until the poll is due, a
+                # device added meanwhile may be due earlier
+                await asyncio.sleep(min(delay, spacing))
+                continue
+            heapq.heappop(self._queue)
+            if coordinator not in self._coordinators:
+                continue
+            self._last_start = loop.time()
+            self._polls[coordinator] = self.hass.async_create_background_task(
+                self._async_poll(coordinator), f"{DOMAIN} hub poll {coordinator.name}"
+            )
+
+    async def _async_poll(self, coordinator: EcocompteurDataUpdateCoordinator) -> None:
+        """Poll a device and queue the result for the next flush."""
+        result: EcocompteurValues | UpdateFailed
+        async with self._semaphore:
+            try:
+                result = await coordinator.async_fetch_update()
+            except UpdateFailed as err:
+                result = err
+            except Exception as err:
+                _LOGGER.exception("Unexpected error polling %s", coordinator.name)
+                result = UpdateFailed(repr(err))
+        self._polls.pop(coordinator, None)
+        if coordinator not in self._coordinators:
+            return
+        self._results[coordinator] = result
+        self._async_enqueue(
+            coordinator,
+            self.hass.loop.time() + coordinator.scheduler.interval.total_seconds(),
+        )
+        if self._flush_handle is None:
+            self._flush_handle = self.hass.loop.call_later(
+                HUB_FLUSH_DELAY, self._async_flush
+            )
+
+    @callback
+    def _async_flush(self) -> None:
+        """Hand all the results collected since the last flush to entities."""
+        self._flush_handle = None
+        results, self._results = self._results, {}
+        for coordinator, result in results.items():
+            if isinstance(result, UpdateFailed):
+                coordinator.async_set_update_error(result)
+            else:
+                coordinator.async_set_updated_data(result)
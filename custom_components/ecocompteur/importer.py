@@ -0,0 +1,285 @@
+"""Backfill of the Ecocompteur log files into long-term statistics."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from contextlib import aclosing
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.components.recorder.models import StatisticData, StatisticMetaData
+from homeassistant.components.recorder.statistics import (
+    async_add_external_statistics,
+)
+from homeassistant.const import UnitOfEnergy, UnitOfVolume
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+from homeassistant.util import slugify
+
+from .api import Ecocompteur, EcocompteurApiError, EcocompteurLogLine
+from .const import DOMAIN
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncGenerator, Callable
+
+    from homeassistant.core import HomeAssistant
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+
+# Number of rows handed to the recorder at once. Also the number of rows
+# parsed between two yields to the event loop.
+IMPORT_BATCH_SIZE = 500
+
+LOG_IMPORT_INTERVAL = timedelta(hours=1)
+
+
+@dataclass(frozen=True, kw_only=True)
+class EcocompteurLog:
+    """Describe an Ecocompteur log file."""
+
+    key: str
+    stream_fn: Callable[[Ecocompteur, int], AsyncGenerator[EcocompteurLogLine]]
+    # Number of leading columns holding the row timestamp
+    time_columns: int
+    # Whether columns hold counter indexes rather than per-period amounts
+    cumulative: bool
+
+
+LOGS: tuple[EcocompteurLog, ...] = (
+    EcocompteurLog(
+        key="log1",
+        stream_fn=Ecocompteur.stream_log1,
+        time_columns=2,
+        cumulative=False,
+    ),
+    EcocompteurLog(
+        key="log2",
+        stream_fn=Ecocompteur.stream_log2,
+        time_columns=1,
+        cumulative=True,
+    ),
+)
+
+
+def log_column_unit(column: str) -> str:
+    """Return the unit of a log column."""
+    if column.startswith("Water"):
+        return UnitOfVolume.LITERS
+    if column.startswith("Gas"):
+        return UnitOfVolume.CUBIC_METERS
+    return UnitOfEnergy.WATT_HOUR
+
+
+def _parse_time(fields: list[str]) -> datetime:
+    """Return the local start of the period described by a row."""
+    if len(fields) == 1:
+        start = datetime.fromisoformat(fields[0])
+    else:
+        start = datetime.fromisoformat(f"{fields[0]}T{fields[1]}")
+    return start.replace(tzinfo=dt_util.get_default_time_zone())
+
+
+def parse_log_row(
+    log: EcocompteurLog, columns: list[str], line: str
+) -> tuple[datetime, list[float]] | None:
+    """Return the start and values of a row, or None when it is malformed."""
+    fields = line.strip().split(",")
+    if not columns or len(fields) != log.time_columns + len(columns):
+        return None
+    try:
+        start = _parse_time(fields[: log.time_columns])
+        values = [float(value) for value in fields[log.time_columns :]]
+    except ValueError:
+        _LOGGER.debug("Skipping malformed %s row: %s", log.key, line)
+        return None
+    return start, values
+
+
+def _accumulate(
+    column_state: dict[str, float], value: float, *, cumulative: bool
+) -> None:
+    """Add a row value to the running sum of a column."""
+    if not cumulative:
+        column_state["sum"] += value
+    elif column_state["state"] is not None:
+        # A counter going backwards has been reset
+        delta = value - column_state["state"]
+        column_state["sum"] += delta if delta >= 0 else value
+    column_state["state"] = value
+
+
+class EcocompteurLogImporter:
+    """
+    Import the Ecocompteur log files into external statistics.
+
+    Logs are streamed and parsed line by line, and statistics are handed to
+    the recorder in batches. The last imported timestamp and the running sums
+    of every column are persisted, so that later runs only process new rows.
+
+    The offset of the first unread byte and the header of every log are
+    persisted too, so that later runs only download the tail of the logs from
+    devices supporting range requests. Rows read again, when a log was
+    rewritten or the device doesn't support them, are skipped by timestamp.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        hass: HomeAssistant,
+        client: Ecocompteur,
+        entry_id: str,
+        name: str,
+        add_log_totals: Callable[[str, dict[str, float]], None] | None = None,
+        log_totals_done: Callable[[], None] | None = None,
+    ) -> None:
+        """
+        Initialize the log importer.
+
+        add_log_totals is called with the day and totals of every row of the
+        cumulative logs read, imported before or not, and log_totals_done once
+        the logs were read, on every run.
+        """
+        self.hass = hass
+        self._add_log_totals = add_log_totals
+        self._log_totals_done = log_totals_done
+        self.client = client
+        self.name = name
+        self._statistic_prefix = f"{DOMAIN}:{slugify(entry_id)}"
+        self._store: Store[dict[str, Any]] = Store(
+            hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}.import"
+        )
+        self._state: dict[str, Any] = {}
+        self._loaded = False
+        self._lock = asyncio.Lock()
+
+    async def async_import(self) -> None:
+        """Import all the rows added to the logs since the last run."""
+        if self._lock.locked():
+            _LOGGER.debug("Log import already running for %s", self.name)
+            return
+        async with self._lock:
+            if not self._loaded:
+                self._state = await self._store.async_load() or {}
+                self._loaded = True
+            for log in LOGS:
+                try:
+                    await self._async_import_log(log)
+                except EcocompteurApiError:
+                    _LOGGER.warning(
+                        "Error fetching %s of %s, will retry later", log.key, self.name
+                    )
+            if self._log_totals_done is not None:
+                self._log_totals_done()
+
+    async def _async_import_log(self, log: EcocompteurLog) -> None:
+        """Import the new rows of a log."""
+        state = self._state.setdefault(log.key, {"last": None, "columns": {}})
+        # Progress persisted along with every batch
+        progress: dict[str, Any] = {
+            "last": state["last"],
+            "header": state.get("header"),
+            "offset": state.get("offset", 0) if state.get("header") else 0,
+        }
+        read_from = progress["offset"]
+        # Work on a copy so that rows parsed but never handed to the recorder
+        # don't leak into the persisted sums
+        columns_state: dict[str, dict[str, float]] = {
+            column: dict(column_state)
+            for column, column_state in state["columns"].items()
+        }
+
+        columns: list[str] = []
+        if progress["header"] is not None:
+            columns = progress["header"].split(",")[log.time_columns :]
+        batches: dict[str, list[StatisticData]] = {column: [] for column in columns}
+        rows = 0
+        imported = 0
+
+        async with aclosing(log.stream_fn(self.client, progress["offset"])) as lines:
+            async for line in lines:
+                if line.end == line.start:
+                    # Still being written, read it again next time
+                    break
+                progress["offset"] = line.end
+                if line.start == 0:
+                    # Read from the start, the header may have changed
+                    progress["header"] = line.text.strip()
+                    columns = progress["header"].split(",")[log.time_columns :]
+                    batches = {column: [] for column in columns}
+                    continue
+                if (row := parse_log_row(log, columns, line.text)) is None:
+                    continue
+                start, values = row
+                if log.cumulative and self._add_log_totals is not None:
+                    self._add_log_totals(
+                        start.date().isoformat(),
+                        dict(zip(columns, values, strict=True)),
+                    )
+                timestamp = start.timestamp()
+                if progress["last"] is not None and timestamp <= progress["last"]:
+                    continue
+
+                for column, value in zip(columns, values, strict=True):
+                    column_state = columns_state.setdefault(
+                        column, {"sum": 0.0, "state": None}
+                    )
+                    _accumulate(column_state, value, cumulative=log.cumulative)
+                    batches[column].append(
+                        StatisticData(start=start, state=value, sum=column_state["sum"])
+                    )
+
+                progress["last"] = timestamp
+                rows += 1
+                if rows == IMPORT_BATCH_SIZE:
+                    await self._async_flush(log, batches, progress, columns_state)
+                    imported += rows
+                    rows = 0
+
+        if rows or progress["offset"] != self._state[log.key].get("offset"):
+            await self._async_flush(log, batches, progress, columns_state)
+            imported += rows
+
+        _LOGGER.debug(
+            "Read %s of %s from offset %s to %s",
+            log.key,
+            self.name,
+            read_from,
+            progress["offset"],
+        )
+        if imported:
+            _LOGGER.debug("Imported %s %s rows of %s", imported, log.key, self.name)
+
+    async def _async_flush(
+        self,
+        log: EcocompteurLog,
+        batches: dict[str, list[StatisticData]],
+        progress: dict[str, Any],
+        columns_state: dict[str, dict[str, float]],
+    ) -> None:
+        """Hand a batch of statistics to the recorder and save the progress."""
+        for column, statistics in batches.items():
+            if not statistics:
+                continue
+            metadata = StatisticMetaData(
+                has_mean=False,
+                has_sum=True,
+                name=f"{self.name} {column}",
+                source=DOMAIN,
+                statistic_id=f"{self._statistic_prefix}_{log.key}_{slugify(column)}",
+                unit_of_measurement=log_column_unit(column),
+            )
+            async_add_external_statistics(self.hass, metadata, statistics)
+            batches[column] = []
+        self._state[log.key] = {
+            **progress,
+            "columns": {
+                column: dict(column_state)
+                for column, column_state in columns_state.items()
+            },
+        }
+        await self._store.async_save(self._state)
+        # Let the event loop breathe between batches
+        await asyncio.sleep(0)
@@ -0,0 +1,166 @@
+"""Timing instrumentation of the Ecocompteur polling pipeline."""
+
+from __future__ import annotations
+
+from bisect import bisect_left
+from collections import Counter
+from time import perf_counter
+from typing import Any
+
+# Stages of a poll, in pipeline order
+STAGE_CONNECT = "connect"
+STAGE_TTFB = "ttfb"
+STAGE_BODY = "body"
+STAGE_PARSE = "parse"
+STAGE_DISPATCH = "dispatch"
+STAGES = (STAGE_CONNECT, STAGE_TTFB, STAGE_BODY, STAGE_PARSE, STAGE_DISPATCH)
+
+# Upper bounds (ms) of the histogram buckets, roughly logarithmic from what
+# parsing takes to what makes a request time out. Durations above the last
+# bound fall in an overflow bucket.
+BUCKET_BOUNDS = (
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    25.0,
+    50.0,
+    100.0,
+    250.0,
+    500.0,
+    1000.0,
+    2500.0,
+    5000.0,
+)
+
+# httpcore trace events delimiting the network stages. The TCP connection is
+# only opened when no idle keep-alive connection is available.
+_TRACE_STARTS = {
+    "connection.connect_tcp.started": STAGE_CONNECT,
+    "http11.send_request_headers.started": STAGE_TTFB,
+    "http11.receive_response_body.started": STAGE_BODY,
+}
+_TRACE_ENDS = {
+    "connection.connect_tcp.complete": STAGE_CONNECT,
+    "http11.receive_response_headers.complete": STAGE_TTFB,
+    "http11.receive_response_body.complete": STAGE_BODY,
+}
+
+
+class EcocompteurHistogram:
+    """
+    Fixed-bucket histogram of durations.
+
+    Recording is a binary search over a handful of bounds and a few integer
+    updates, so it can be left enabled on every poll.
+    """
+
+    __slots__ = ("buckets", "count", "last", "max", "total")
+
+    def __init__(self) -> None:
+        """Initialize the histogram."""
+        self.buckets = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last: float | None = None
+
+    def record(self, duration: float) -> None:
+        """Record a duration, in ms."""
+        self.buckets[bisect_left(BUCKET_BOUNDS, duration)] += 1
+        self.count += 1
+        self.total += duration
+        self.max = max(self.max, duration)
+        self.last = duration
+
+    @property
+    def mean(self) -> float | None:
+        """Return the mean duration."""
+        return self.total / self.count if self.count else None
+
+    def percentile(self, percentile: float) -> float | None:
+        """Return the upper bound of the bucket holding a percentile, capped by max."""
+        if not self.count:
+            return None
+        rank = self.count * percentile / 100
+        seen = 0
+        for idx, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank and count and idx < len(BUCKET_BOUNDS):
+                return min(BUCKET_BOUNDS[idx], self.max)
+        return self.max
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return a summary of the histogram."""
+        return {
+            "count": self.count,
+            "last": self.last,
+            "mean": self.mean,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "max": self.max,
+            "buckets": {
+                f"le_{bound:g}": count
+                for bound, count in zip(
+                    (*BUCKET_BOUNDS, float("inf")), self.buckets, strict=True
+                )
+            },
+        }
+
+
+class EcocompteurMetrics:
+    """Stage timings, request and error counts of an Ecocompteur."""
+
+    def __init__(self) -> None:
+        """Initialize the metrics."""
+        self.stages = {stage: EcocompteurHistogram() for stage in STAGES}
+        self.requests: Counter[str] = Counter()
+        self.errors: Counter[str] = Counter()
+        # Responses that needed no decoding nor entity updates: answered 304
+        # to a conditional request, or byte-identical to the previous body
+        self.not_modified: Counter[str] = Counter()
+        self.unchanged: Counter[str] = Counter()
+        # Bytes of the log files received
+        self.received: Counter[str] = Counter()
+
+    def record(self, stage: str, start: float) -> None:
+        """Record the duration of a stage started at perf_counter() start."""
+        self.stages[stage].record((perf_counter() - start) * 1000)
+
+    def trace(self) -> _RequestTrace:
+        """Return an httpcore trace callback timing the network stages."""
+        return _RequestTrace(self)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return all the metrics."""
+        return {
+            "stages_ms": {
+                stage: histogram.as_dict() for stage, histogram in self.stages.items()
+            },
+            "requests": dict(self.requests),
+            "errors": dict(self.errors),
+            "not_modified": dict(self.not_modified),
+            "unchanged": dict(self.unchanged),
+            "received": dict(self.received),
+        }
+
+
+class _RequestTrace:
+    """Time the network stages of one request from httpcore trace events."""
+
+    __slots__ = ("_metrics", "_starts")
+
+    def __init__(self, metrics: EcocompteurMetrics) -> None:
+        self._metrics = metrics
+        self._starts: dict[str, float] = {}
+
+    async def __call__(self, event_name: str, _info: dict[str, Any]) -> None:
+        if (stage := _TRACE_STARTS.get(event_name)) is not None:
+            self._starts[stage] = perf_counter()
+        elif (stage := _TRACE_ENDS.get(event_name)) is not None and (
+            start := self._starts.pop(stage, None)
+        ) is not None:
+            self._metrics.record(stage, start)
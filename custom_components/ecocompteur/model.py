@@ -0,0 +1,152 @@
+"""Snapshots of the data served by an Ecocompteur."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, fields
+from typing import Any, Self
+
+from .const import POWER_KEYS
+
+# TIC counters of data.json, in storage order
+CONSO_KEYS = ("base", "hc", "hp", "hc_b", "hp_b", "hc_w", "hp_w", "hc_r", "hp_r")
+CONSO_INDEX = {key: idx for idx, key in enumerate(CONSO_KEYS)}
+
+# inst.json fields kept in a snapshot, in storage order: power of the 5
+# circuits, then the pulse counters. Sensors share this order.
+SAMPLE_KEYS = (
+    "data1",
+    "data2",
+    "data3",
+    "data4",
+    "data5",
+    "data6",
+    "data7",
+    "CIR1_Nrj",
+    "CIR2_Nrj",
+    "CIR3_Nrj",
+    "CIR4_Nrj",
+)
+SAMPLE_INDEX = {key: idx for idx, key in enumerate(SAMPLE_KEYS)}
+
+
+@dataclass(frozen=True, slots=True)
+class EcocompteurInput:
+    """A measuring input of the device, a circuit or a pulse counter."""
+
+    label: str
+    type: int
+    disabled: bool
+
+
+@dataclass(frozen=True, slots=True)
+class EcocompteurConfig:
+    """
+    The configuration and TIC counters of data.json.
+
+    Snapshots are immutable and compared field by field, so that an unchanged
+    configuration costs a single equality check. TIC counters are stored in
+    CONSO_KEYS order.
+    """
+
+    option_tarifaire: int
+    tarif_courant: int
+    isousc: int
+    conso: tuple[int, ...]
+    inputs: tuple[EcocompteurInput, ...]
+
+    def counter(self, key: str) -> int:
+        """Return a TIC counter by its key."""
+        return self.conso[CONSO_INDEX[key]]
+
+    def diff(self, other: EcocompteurConfig | None) -> set[str]:
+        """Return the names of the fields differing from another snapshot."""
+        if other is None:
+            return {field.name for field in fields(self)}
+        return {
+            field.name
+            for field in fields(self)
+            if getattr(self, field.name) != getattr(other, field.name)
+        }
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the snapshot in the structure of Ecocompteur.fetch_data."""
+        return {
+            "option_tarifaire": self.option_tarifaire,
+            "tarif_courant": self.tarif_courant,
+            "isousc": self.isousc,
+            "conso": dict(zip(CONSO_KEYS, self.conso, strict=True)),
+            "inputs": [
+                {"label": i.label, "type": i.type, "disabled": i.disabled}
+                for i in self.inputs
+            ],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> Self:
+        """Restore a snapshot from the output of as_dict."""
+        return cls(
+            data["option_tarifaire"],
+            data["tarif_courant"],
+            data["isousc"],
+            tuple(data["conso"][key] for key in CONSO_KEYS),
+            tuple(
+                EcocompteurInput(i["label"], i["type"], bool(i["disabled"]))
+                for i in data["inputs"]
+            ),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class EcocompteurValues:
+    """
+    The real-time values of inst.json, stamped with the device time.
+
+    Values are stored in SAMPLE_KEYS order, and are 0 when the device left
+    them out. The timestamp is None when the device didn't send Date_Time.
+    """
+
+    timestamp: int | None
+    values: tuple[float, ...]
+
+    @property
+    def power(self) -> tuple[float, ...]:
+        """Return the power drawn by each circuit."""
+        return self.values[: len(POWER_KEYS)]
+
+    @property
+    def counters(self) -> tuple[float, ...]:
+        """Return the pulse counters, water and gas volumes."""
+        return self.values[len(POWER_KEYS) :]
+
+    def get(self, key: str) -> float:
+        """Return the value of an inst.json field."""
+        return self.values[SAMPLE_INDEX[key]]
+
+    def diff(self, other: EcocompteurValues | None) -> set[str]:
+        """Return the inst.json fields differing from another snapshot."""
+        if other is None:
+            return set(SAMPLE_KEYS)
+        return {
+            key
+            for key, value, previous in zip(
+                SAMPLE_KEYS, self.values, other.values, strict=True
+            )
+            if value != previous
+        }
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the snapshot in the structure of inst.json."""
+        data: dict[str, Any] = dict(zip(SAMPLE_KEYS, self.values, strict=True))
+        if self.timestamp is not None:
+            data["Date_Time"] = self.timestamp
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> Self:
+        """Build a snapshot from an inst.json document."""
+        get = data.get
+        timestamp = get("Date_Time")
+        return cls(
+            None if timestamp is None else int(timestamp),
+            tuple([get(key) or 0.0 for key in SAMPLE_KEYS]),
+        )
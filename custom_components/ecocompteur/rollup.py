@@ -0,0 +1,164 @@
+"""Day, month and year totals of the Ecocompteur consumption."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.const import UnitOfEnergy
+
+from .importer import log_column_unit
+from .model import CONSO_KEYS
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Mapping
+
+PERIOD_DAY = "day"
+PERIOD_MONTH = "month"
+PERIOD_YEAR = "year"
+PERIODS = (PERIOD_DAY, PERIOD_MONTH, PERIOD_YEAR)
+
+# Bucket keys are prefixes of ISO dates: 2025-01-31, 2025-01 and 2025
+_KEY_LENGTHS = {PERIOD_DAY: 10, PERIOD_MONTH: 7, PERIOD_YEAR: 4}
+
+# Number of day buckets kept. Month and year buckets are all kept.
+DAY_HISTORY = 366
+
+# A counter dropping below this fraction of its last value has been reset,
+# e.g. when the meter was replaced. Smaller drops are reading glitches.
+RESET_RATIO = 0.5
+
+
+def series_unit(series: str) -> str:
+    """Return the unit of a series, a TIC counter or a log2.csv column."""
+    if series in CONSO_KEYS:
+        return UnitOfEnergy.WATT_HOUR
+    return log_column_unit(series)
+
+
+class EcocompteurRollups:
+    """
+    Day, month and year totals of cumulative counters.
+
+    Series are the TIC counters of data.json (base, hc, hp...) and the daily
+    totals of log2.csv (Circuit1_Total...Gas_Total). Both are cumulative, so
+    the last value of every counter is kept, and the increase since then is
+    added to the day, month and year buckets of the day it was seen on. A
+    counter dropping below RESET_RATIO of its last value has been reset, and
+    its new value is added. Zero readings, e.g. of TIC counters while the TIC
+    link is down, and smaller drops are ignored, and the last value is kept.
+    An update costs one dictionary update per period, whatever the history.
+
+    log2.csv rows are added once, in day order: rows of days already added
+    are ignored, so the log can be fed again from its start.
+    """
+
+    def __init__(
+        self,
+        buckets: dict[str, dict[str, dict[str, float]]] | None = None,
+        counters: dict[str, float] | None = None,
+        log_day: str | None = None,
+    ) -> None:
+        """Initialize the totals."""
+        self.buckets = buckets or {period: {} for period in PERIODS}
+        self.log_day = log_day
+        self._counters = counters or {}
+        # Key of the latest bucket of every period and series
+        self._latest: dict[tuple[str, str], str] = {}
+        for period, buckets_by_key in self.buckets.items():
+            for key in sorted(buckets_by_key):
+                for series in buckets_by_key[key]:
+                    self._latest[period, series] = key
+
+    @property
+    def series(self) -> set[str]:
+        """Return the series with at least one bucket."""
+        return {series for _, series in self._latest}
+
+    def add(self, day: str, series: str, amount: float) -> None:
+        """Add an amount of a series to the buckets of a day."""
+        for period in PERIODS:
+            key = day[: _KEY_LENGTHS[period]]
+            bucket = self.buckets[period].setdefault(key, {})
+            bucket[series] = bucket.get(series, 0.0) + amount
+            if key >= self._latest.get((period, series), ""):
+                self._latest[period, series] = key
+        days = self.buckets[PERIOD_DAY]
+        if len(days) > DAY_HISTORY:
+            del days[min(days)]
+
+    def add_counters(self, day: str, counters: Iterable[tuple[str, float]]) -> None:
+        """Add the increase of cumulative counters since their last values."""
+        for series, value in counters:
+            if not value:
+                # Not read
+                continue
+            last = self._counters.get(series)
+            if last is not None:
+                if value > last:
+                    self.add(day, series, value - last)
+                elif value < last * RESET_RATIO:
+                    # Counted up from zero since the reset
+                    self.add(day, series, value)
+                else:
+                    continue
+            self._counters[series] = value
+
+    def add_log_totals(self, day: str, totals: Mapping[str, float]) -> None:
+        """Add the cumulative totals of a log2.csv row, unless already added."""
+        if self.log_day is not None and day <= self.log_day:
+            return
+        self.log_day = day
+        self.add_counters(day, totals.items())
+
+    def latest(self, period: str, series: str) -> tuple[str, float] | None:
+        """Return the key and amount of the latest bucket of a series."""
+        if (key := self._latest.get((period, series))) is None:
+            return None
+        if (amount := self.buckets[period].get(key, {}).get(series)) is None:
+            # Dropped from the day history
+            return None
+        return key, amount
+
+    def query(
+        self,
+        period: str,
+        start: str | None = None,
+        end: str | None = None,
+        series: Iterable[str] | None = None,
+    ) -> dict[str, dict[str, float]]:
+        """
+        Return the buckets of a period between two ISO dates, both included.
+
+        Only the given series are returned, all of them by default.
+        """
+        length = _KEY_LENGTHS[period]
+        start = start[:length] if start else ""
+        end = end[:length] if end else "~"
+        wanted = set(series) if series is not None else None
+        buckets: dict[str, dict[str, float]] = {}
+        for key, bucket in sorted(self.buckets[period].items()):
+            if not start <= key <= end:
+                continue
+            amounts = {
+                name: amount
+                for name, amount in bucket.items()
+                if wanted is None or name in wanted
+            }
+            if amounts:
+                buckets[key] = amounts
+        return buckets
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the totals to persist."""
+        return {
+            "buckets": self.buckets,
+            "counters": self._counters,
+            "log_day": self.log_day,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any] | None) -> EcocompteurRollups:
+        """Restore the totals from their persisted state."""
+        if not data:
+            return cls()
+        return cls(data["buckets"], data["counters"], data["log_day"])
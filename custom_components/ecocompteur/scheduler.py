@@ -0,0 +1,100 @@
+"""Adaptive polling interval for Ecocompteur devices."""
+
+import random
+from collections.abc import Sequence
+from datetime import timedelta
+
+# Relative change of the power readings between two polls above which the
+# interval is shortened, and below which readings are considered flat.
+VOLATILE_CHANGE = 0.10
+FLAT_CHANGE = 0.02
+
+# Readings below this total power (W) are compared against it instead, so
+# that a few watts of noise at night don't count as volatility.
+POWER_FLOOR = 100.0
+
+# The interval is shortened by this factor while readings change quickly and
+# grown by this one while they are flat.
+SPEED_UP_FACTOR = 0.5
+SLOW_DOWN_FACTOR = 1.25
+
+# The device should not spend more than a quarter of its time answering us.
+LATENCY_FACTOR = 4
+
+# Random spread applied to failure back-off, so that devices failing together
+# (e.g. on a network outage) don't retry in lockstep.
+BACKOFF_JITTER = 0.2
+MAX_BACKOFF_EXPONENT = 10
+
+
+class EcocompteurScheduler:
+    """
+    Compute the polling interval of an Ecocompteur.
+
+    The interval shrinks towards the minimum while power readings change
+    quickly, grows towards the maximum while they are flat, never goes below
+    a multiple of the device's response time, and backs off exponentially
+    with jitter after failures.
+    """
+
+    def __init__(
+        self,
+        base_interval: timedelta,
+        min_interval: timedelta,
+        max_interval: timedelta,
+    ) -> None:
+        """Initialize the scheduler."""
+        self.min_interval = min_interval.total_seconds()
+        self.max_interval = max_interval.total_seconds()
+        self._base_interval = base_interval.total_seconds()
+        self._base = self._clamp(self._base_interval)
+        self._interval = self._base
+        self._power: Sequence[float] | None = None
+        self.failures = 0
+
+    @property
+    def interval(self) -> timedelta:
+        """Return the current polling interval."""
+        return timedelta(seconds=self._interval)
+
+    def _clamp(self, interval: float) -> float:
+        return min(max(interval, self.min_interval), self.max_interval)
+
+    def set_bounds(self, min_interval: timedelta, max_interval: timedelta) -> None:
+        """Change the minimum and maximum intervals, keeping the current state."""
+        self.min_interval = min_interval.total_seconds()
+        self.max_interval = max_interval.total_seconds()
+        self._base = self._clamp(self._base_interval)
+        self._interval = self._clamp(self._interval)
+
+    def success(self, latency: float, power: Sequence[float]) -> timedelta:
+        """Return the interval to use after a successful poll."""
+        if self.failures:
+            # Start over from the base interval after an outage
+            self.failures = 0
+            self._interval = self._base
+        elif self._power is not None:
+            change = sum(
+                abs(current - previous)
+                for current, previous in zip(power, self._power, strict=True)
+            ) / max(sum(self._power), POWER_FLOOR)
+            if change >= VOLATILE_CHANGE:
+                # React immediately, even after a long quiet period
+                self._interval = min(self._interval, self._base) * SPEED_UP_FACTOR
+            elif change <= FLAT_CHANGE:
+                self._interval *= SLOW_DOWN_FACTOR
+            else:
+                # Drift back towards the base interval
+                self._interval = (self._interval + self._base) / 2
+        self._power = power
+        self._interval = self._clamp(max(self._interval, latency * LATENCY_FACTOR))
+        return self.interval
+
+    def failure(self) -> timedelta:
+        """Return the interval to use after a failed poll."""
+        self.failures += 1
+        self._power = None
+        backoff = self._base * 2 ** min(self.failures, MAX_BACKOFF_EXPONENT)
+        jitter = random.uniform(1 - BACKOFF_JITTER, 1 + BACKOFF_JITTER)  # noqa: S311
+        self._interval = self._clamp(backoff * jitter)
+        return self.interval
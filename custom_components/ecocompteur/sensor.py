@@ -4,6 +4,8 @@ from __future__ import annotations
 
 import logging
 from dataclasses import dataclass
+from datetime import date
+from functools import partial
 from typing import TYPE_CHECKING
 
 from homeassistant.components.sensor import (
@@ -14,20 +16,42 @@ from homeassistant.components.sensor.const import (
     SensorDeviceClass,
     SensorStateClass,
 )
-from homeassistant.const import UnitOfEnergy, UnitOfPower, UnitOfVolume
+from homeassistant.const import (
+    EntityCategory,
+    Platform,
+    UnitOfEnergy,
+    UnitOfPower,
+    UnitOfTime,
+    UnitOfVolume,
+    UnitOfVolumeFlowRate,
+)
 from homeassistant.core import callback
-from homeassistant.helpers.device_registry import DeviceInfo
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
+from homeassistant.util import dt as dt_util
 
-from .api import Ecocompteur
-from .const import DOMAIN, MANUFACTURER, MODEL
-from .coordinator import EcocompteurDataUpdateCoordinator
+from .coordinator import (
+    ROLLUP_CONTEXT,
+    TARIFF_PERIOD_CONTEXT,
+    EcocompteurConfigUpdateCoordinator,
+    EcocompteurDataUpdateCoordinator,
+)
+from .energy import ENERGY_KEYS
+from .entity import EcocompteurEntityManager
+from .flow import COUNTER_KEYS, FLOW_KEYS, ROLLING_FLOW_KEYS
+from .metrics import STAGES
+from .model import CONSO_INDEX, CONSO_KEYS, SAMPLE_INDEX, SAMPLE_KEYS
+from .rollup import PERIOD_DAY, PERIOD_MONTH, PERIOD_YEAR, PERIODS, series_unit
 
 if TYPE_CHECKING:
+    from collections.abc import Callable
+
     from homeassistant.core import HomeAssistant
+    from homeassistant.helpers.device_registry import DeviceInfo
+    from homeassistant.helpers.entity import Entity
     from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
     from . import EcocompteurConfigEntry
+    from .model import EcocompteurConfig
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -39,6 +63,28 @@ class EcocompteurSensorEntityDescription(SensorEntityDescription):
     config_idx: int
 
 
+@dataclass(frozen=True, kw_only=True)
+class EcocompteurTariffSensorEntityDescription(EcocompteurSensorEntityDescription):
+    """Describe the energy drawn by a circuit during a tariff period."""
+
+    period: str
+
+
+@dataclass(frozen=True, kw_only=True)
+class EcocompteurRollupSensorEntityDescription(SensorEntityDescription):
+    """Describe the latest day, month or year total of a series."""
+
+    series: str
+    period: str
+
+
+@dataclass(frozen=True, kw_only=True)
+class EcocompteurStageSensorEntityDescription(SensorEntityDescription):
+    """Describe a sensor timing a stage of the polling pipeline."""
+
+    stage: str
+
+
 TIC_SENSORS: tuple[SensorEntityDescription, ...] = (
     SensorEntityDescription(
         key="base",
@@ -194,6 +240,154 @@ SENSORS: tuple[EcocompteurSensorEntityDescription, ...] = (
     ),
 )
 
+ENERGY_SENSORS: tuple[EcocompteurSensorEntityDescription, ...] = tuple(
+    EcocompteurSensorEntityDescription(
+        key=key,
+        config_idx=config_idx,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        device_class=SensorDeviceClass.ENERGY,
+        native_unit_of_measurement=UnitOfEnergy.WATT_HOUR,
+        suggested_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
+        suggested_display_precision=3,
+    )
+    for config_idx, key in enumerate(ENERGY_KEYS)
+)
+
+FLOW_SENSORS: tuple[EcocompteurSensorEntityDescription, ...] = tuple(
+    EcocompteurSensorEntityDescription(
+        key=key,
+        config_idx=SAMPLE_INDEX[counter_key],
+        state_class=SensorStateClass.MEASUREMENT,
+        device_class=SensorDeviceClass.VOLUME_FLOW_RATE,
+        native_unit_of_measurement=UnitOfVolumeFlowRate.LITERS_PER_MINUTE,
+        suggested_display_precision=1,
+    )
+    for counter_key, key in zip(COUNTER_KEYS, FLOW_KEYS, strict=True)
+)
+
+ROLLING_FLOW_SENSORS: tuple[EcocompteurSensorEntityDescription, ...] = tuple(
+    EcocompteurSensorEntityDescription(
+        key=key,
+        config_idx=SAMPLE_INDEX[counter_key],
+        state_class=SensorStateClass.MEASUREMENT,
+        device_class=SensorDeviceClass.VOLUME_FLOW_RATE,
+        native_unit_of_measurement=UnitOfVolumeFlowRate.CUBIC_METERS_PER_HOUR,
+        suggested_display_precision=3,
+    )
+    for counter_key, key in zip(COUNTER_KEYS, ROLLING_FLOW_KEYS, strict=True)
+)
+
+SKIPPED_UPDATES_SENSOR = SensorEntityDescription(
+    key="skipped_updates",
+    translation_key="skipped_updates",
+    entity_category=EntityCategory.DIAGNOSTIC,
+    entity_registry_enabled_default=False,
+    state_class=SensorStateClass.TOTAL_INCREASING,
+)
+
+STAGE_SENSORS: tuple[EcocompteurStageSensorEntityDescription, ...] = tuple(
+    EcocompteurStageSensorEntityDescription(
+        key=f"{stage}_time",
+        translation_key=f"{stage}_time",
+        stage=stage,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False,
+        state_class=SensorStateClass.MEASUREMENT,
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        suggested_display_precision=2,
+    )
+    for stage in STAGES
+)
+
+REQUEST_ERRORS_SENSOR = SensorEntityDescription(
+    key="request_errors",
+    translation_key="request_errors",
+    entity_category=EntityCategory.DIAGNOSTIC,
+    entity_registry_enabled_default=False,
+    state_class=SensorStateClass.TOTAL_INCREASING,
+)
+
+TARIFF_PERIOD_SENSOR = SensorEntityDescription(
+    key="tariff_period",
+    translation_key="tariff_period",
+    device_class=SensorDeviceClass.ENUM,
+    options=list(CONSO_KEYS),
+)
+
+
+def _tariff_sensor_descriptions(
+    period: str,
+) -> tuple[EcocompteurTariffSensorEntityDescription, ...]:
+    """Describe the energy drawn by every circuit during a tariff period."""
+    return tuple(
+        EcocompteurTariffSensorEntityDescription(
+            key=f"{key}_{period}",
+            config_idx=config_idx,
+            period=period,
+            state_class=SensorStateClass.TOTAL_INCREASING,
+            device_class=SensorDeviceClass.ENERGY,
+            native_unit_of_measurement=UnitOfEnergy.WATT_HOUR,
+            suggested_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
+            suggested_display_precision=3,
+        )
+        for config_idx, key in enumerate(ENERGY_KEYS)
+    )
+
+
+_ROLLUP_NAMES = {PERIOD_DAY: "daily", PERIOD_MONTH: "monthly", PERIOD_YEAR: "yearly"}
+
+_UNIT_DEVICE_CLASSES = {
+    UnitOfEnergy.WATT_HOUR: SensorDeviceClass.ENERGY,
+    UnitOfVolume.LITERS: SensorDeviceClass.WATER,
+    UnitOfVolume.CUBIC_METERS: SensorDeviceClass.GAS,
+}
+
+
+def _rollup_sensor_descriptions(
+    series: str,
+) -> tuple[EcocompteurRollupSensorEntityDescription, ...]:
+    """Describe the day, month and year totals of a series."""
+    unit = series_unit(series)
+    energy = unit == UnitOfEnergy.WATT_HOUR
+    return tuple(
+        EcocompteurRollupSensorEntityDescription(
+            key=f"rollup_{series.lower()}_{period}",
+            series=series,
+            period=period,
+            state_class=SensorStateClass.TOTAL,
+            device_class=_UNIT_DEVICE_CLASSES[unit],
+            native_unit_of_measurement=unit,
+            suggested_unit_of_measurement=(
+                UnitOfEnergy.KILO_WATT_HOUR if energy else None
+            ),
+            suggested_display_precision=3 if energy else None,
+            # Monthly totals are the most charted
+            entity_registry_enabled_default=period == PERIOD_MONTH,
+        )
+        for period in PERIODS
+    )
+
+
+def _rollup_label(series: str, config: EcocompteurConfig) -> str:
+    """Return the label of a TIC counter or log2.csv column."""
+    if series in CONSO_INDEX:
+        return series.upper().replace("_", " ")
+    name = series.removesuffix("_Total")
+    circuit = name.removeprefix("Circuit")
+    if circuit.isdigit() and 0 < int(circuit) <= len(config.inputs):
+        return config.inputs[int(circuit) - 1].label
+    return name
+
+
+def _bucket_start(period: str, key: str) -> date:
+    """Return the first day of a rollup bucket."""
+    if period == PERIOD_YEAR:
+        return date(int(key), 1, 1)
+    if period == PERIOD_MONTH:
+        return date.fromisoformat(f"{key}-01")
+    return date.fromisoformat(key)
+
 
 async def async_setup_entry(
     hass: HomeAssistant,
@@ -202,27 +396,148 @@ async def async_setup_entry(
 ) -> None:
     """Set up Ecocompteur sensors."""
     entry_id = config_entry.entry_id
+    coordinator = config_entry.runtime_data.coordinator
+    config_coordinator = coordinator.config_coordinator
+    device_info = config_entry.runtime_data.device_info
+
+    # TIC counters of the tariff option. They only change with the option,
+    # never with the readings, so that registry entries of counters reading
+    # zero for a while are kept.
+    tic_manager = EcocompteurEntityManager(
+        hass,
+        entry_id,
+        Platform.SENSOR,
+        async_add_entities,
+        (f"{entry_id}_conso_{description.key}" for description in TIC_SENSORS),
+    )
+    tic_synced: frozenset[str] | None = None
 
-    client = Ecocompteur(hass, config_entry.runtime_data.host)
-    coordinator = EcocompteurDataUpdateCoordinator(hass, entry_id, client)
-
-    await coordinator.async_config_entry_first_refresh()
+    @callback
+    def _async_sync_tic_sensors() -> None:
+        nonlocal tic_synced
+        if (counters := coordinator.tariffs.counters) is None:
+            # Not known yet, e.g. after an upgrade until the first sample
+            return
+        if (in_use := frozenset(counters)) == tic_synced:
+            return
+        tic_synced = in_use
+        tic_manager.async_sync(
+            {
+                f"{entry_id}_conso_{description.key}": partial(
+                    EcocompteurTicSensor,
+                    description,
+                    config_coordinator,
+                    device_info,
+                    entry_id,
+                )
+                for description in TIC_SENSORS
+                if description.key in in_use
+            }
+        )
+
+    _async_sync_tic_sensors()
+    # The accounting follows the tariff option as samples come in
+    config_entry.async_on_unload(
+        coordinator.async_add_listener(_async_sync_tic_sensors)
+    )
 
-    device_info = DeviceInfo(
-        identifiers={(DOMAIN, entry_id)},
-        manufacturer=MANUFACTURER,
-        model=MODEL,
-        name=config_entry.runtime_data.name,
+    async_add_entities(
+        [
+            EcocompteurSkippedUpdatesSensor(
+                SKIPPED_UPDATES_SENSOR, coordinator, device_info, entry_id
+            ),
+            EcocompteurRequestErrorsSensor(
+                REQUEST_ERRORS_SENSOR, coordinator, device_info, entry_id
+            ),
+        ]
     )
 
     async_add_entities(
-        EcocompteurTicSensor(description, coordinator, device_info, entry_id)
-        for description in TIC_SENSORS
+        EcocompteurStageSensor(description, coordinator, device_info, entry_id)
+        for description in STAGE_SENSORS
     )
 
     async_add_entities(
-        EcocompteurSensor(description, coordinator, device_info, entry_id)
-        for description in SENSORS
+        [
+            EcocompteurTariffPeriodSensor(
+                TARIFF_PERIOD_SENSOR, coordinator, device_info, entry_id
+            )
+        ]
+    )
+
+    # Sensors of the active inputs, energy per tariff period included, as
+    # the periods in use are found out. Inputs come and go as they are
+    # enabled and disabled in the options or on the device.
+    manager = EcocompteurEntityManager(
+        hass,
+        entry_id,
+        Platform.SENSOR,
+        async_add_entities,
+        (
+            f"{entry_id}_{description.key}"
+            for description in (
+                *SENSORS,
+                *ENERGY_SENSORS,
+                *FLOW_SENSORS,
+                *ROLLING_FLOW_SENSORS,
+                *(
+                    description
+                    for period in CONSO_KEYS
+                    for description in _tariff_sensor_descriptions(period)
+                ),
+            )
+        ),
+    )
+    synced: tuple[frozenset[int], frozenset[str]] | None = None
+
+    @callback
+    def _async_sync_input_sensors() -> None:
+        nonlocal synced
+        inputs = coordinator.active_inputs
+        periods = frozenset(coordinator.tariffs.totals)
+        if (inputs, periods) == synced:
+            return
+        synced = inputs, periods
+        wanted: dict[str, Callable[[], Entity]] = {}
+        for entity_class, descriptions in (
+            (EcocompteurSensor, SENSORS),
+            (EcocompteurEnergySensor, ENERGY_SENSORS),
+            (EcocompteurFlowSensor, FLOW_SENSORS),
+            (EcocompteurRollingFlowSensor, ROLLING_FLOW_SENSORS),
+            *(
+                (EcocompteurTariffEnergySensor, _tariff_sensor_descriptions(period))
+                for period in sorted(periods)
+            ),
+        ):
+            for description in descriptions:
+                if description.config_idx in inputs:
+                    wanted[f"{entry_id}_{description.key}"] = partial(
+                        entity_class, description, coordinator, device_info, entry_id
+                    )
+        manager.async_sync(wanted)
+
+    _async_sync_input_sensors()
+    config_entry.async_on_unload(
+        coordinator.async_add_listener(_async_sync_input_sensors)
+    )
+
+    # Day, month and year totals, added as the series are rolled up
+    rollup_series: set[str] = set()
+
+    @callback
+    def _async_add_rollup_sensors() -> None:
+        if not (series := coordinator.rollups.series - rollup_series):
+            return
+        rollup_series.update(series)
+        async_add_entities(
+            EcocompteurRollupSensor(description, coordinator, device_info, entry_id)
+            for name in sorted(series)
+            for description in _rollup_sensor_descriptions(name)
+        )
+
+    _async_add_rollup_sensors()
+    config_entry.async_on_unload(
+        coordinator.async_add_listener(_async_add_rollup_sensors)
     )
 
 
@@ -234,7 +549,7 @@ class EcocompteurTicSensor(CoordinatorEntity, SensorEntity):
     def __init__(
         self,
         entity_description: SensorEntityDescription,
-        coordinator: EcocompteurDataUpdateCoordinator,
+        coordinator: EcocompteurConfigUpdateCoordinator,
         device_info: DeviceInfo,
         entry_id: str,
     ) -> None:
@@ -244,14 +559,25 @@ class EcocompteurTicSensor(CoordinatorEntity, SensorEntity):
         self._coordinator = coordinator
         self._attr_device_info = device_info
         self._attr_unique_id = f"{entry_id}_conso_{entity_description.key}"
+        self._conso_idx = CONSO_INDEX[entity_description.key]
         self._update_attrs()
 
     def _update_attrs(self) -> None:
         """Update state attributes."""
-        config = self._coordinator.data["config"]["conso"]
         key = self.entity_description.key
         self._attr_name = key.upper().replace("_", " ")
-        self._attr_native_value = config[key]
+        self._attr_native_value = self._coordinator.data.conso[self._conso_idx]
+
+    @property
+    def available(self) -> bool:
+        """
+        Return whether the counter was read.
+
+        A TIC index is never zero once counting: the device reads zero while
+        the TIC link is down or before the index starts counting, which would
+        look like a meter reset to long-term statistics.
+        """
+        return super().available and bool(self._attr_native_value)
 
     @callback
     def _handle_coordinator_update(self) -> None:
@@ -280,21 +606,354 @@ class EcocompteurSensor(CoordinatorEntity, SensorEntity):
         self._coordinator = coordinator
         self._attr_device_info = device_info
         self._attr_unique_id = f"{entry_id}_{entity_description.key}"
+        self._value_idx = SAMPLE_INDEX[entity_description.key]
+        self._update_attrs()
+
+    def _update_attrs(self) -> None:
+        """Update state attributes."""
+        config_idx = self.entity_description.config_idx
+        config_input = self._coordinator.config_coordinator.data.inputs[config_idx]
+
+        self._attr_name = config_input.label
+        self._attr_native_value = self._coordinator.data.values[self._value_idx]
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Handle updated data from the coordinator."""
+        self._update_attrs()
+        self.async_write_ha_state()
+
+
+class EcocompteurEnergySensor(CoordinatorEntity, SensorEntity):
+    """Energy drawn by a circuit, integrated from its power readings."""
+
+    entity_description: EcocompteurSensorEntityDescription
+
+    _attr_has_entity_name = True
+
+    def __init__(
+        self,
+        entity_description: EcocompteurSensorEntityDescription,
+        coordinator: EcocompteurDataUpdateCoordinator,
+        device_info: DeviceInfo,
+        entry_id: str,
+    ) -> None:
+        """Initialize the sensor."""
+        super().__init__(coordinator, context=entity_description.key)
+        self.entity_description = entity_description
+        self._coordinator = coordinator
+        self._attr_device_info = device_info
+        self._attr_unique_id = f"{entry_id}_{entity_description.key}"
+        self._update_attrs()
+
+    def _update_attrs(self) -> None:
+        """Update state attributes."""
+        config_idx = self.entity_description.config_idx
+        config_input = self._coordinator.config_coordinator.data.inputs[config_idx]
+
+        self._attr_name = f"{config_input.label} energy"
+        self._attr_native_value = self._coordinator.energy.totals[config_idx]
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Handle updated data from the coordinator."""
+        self._update_attrs()
+        self.async_write_ha_state()
+
+
+class EcocompteurFlowSensor(CoordinatorEntity, SensorEntity):
+    """Flow rate of a pulse counter since its previous reading."""
+
+    entity_description: EcocompteurSensorEntityDescription
+
+    _attr_has_entity_name = True
+
+    def __init__(
+        self,
+        entity_description: EcocompteurSensorEntityDescription,
+        coordinator: EcocompteurDataUpdateCoordinator,
+        device_info: DeviceInfo,
+        entry_id: str,
+    ) -> None:
+        """Initialize the sensor."""
+        super().__init__(coordinator, context=entity_description.key)
+        self.entity_description = entity_description
+        self._coordinator = coordinator
+        self._attr_device_info = device_info
+        self._attr_unique_id = f"{entry_id}_{entity_description.key}"
+        self._counter_idx = COUNTER_KEYS.index(
+            SAMPLE_KEYS[entity_description.config_idx]
+        )
+        self._update_attrs()
+
+    def _update_attrs(self) -> None:
+        """Update state attributes."""
+        config_idx = self.entity_description.config_idx
+        config_input = self._coordinator.config_coordinator.data.inputs[config_idx]
+
+        self._attr_name = f"{config_input.label} flow rate"
+        self._attr_native_value = self._coordinator.flows.rates[self._counter_idx]
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Handle updated data from the coordinator."""
+        self._update_attrs()
+        self.async_write_ha_state()
+
+
+class EcocompteurRollingFlowSensor(EcocompteurFlowSensor):
+    """Flow rate of a pulse counter over the last few minutes."""
+
+    def _update_attrs(self) -> None:
+        """Update state attributes."""
+        config_idx = self.entity_description.config_idx
+        config_input = self._coordinator.config_coordinator.data.inputs[config_idx]
+        flows = self._coordinator.flows
+
+        self._attr_name = f"{config_input.label} average flow rate"
+        self._attr_native_value = flows.rolling_rates[self._counter_idx]
+
+
+class EcocompteurTariffPeriodSensor(CoordinatorEntity, SensorEntity):
+    """The active tariff period, with the codes reported by the device."""
+
+    _attr_has_entity_name = True
+
+    def __init__(
+        self,
+        entity_description: SensorEntityDescription,
+        coordinator: EcocompteurDataUpdateCoordinator,
+        device_info: DeviceInfo,
+        entry_id: str,
+    ) -> None:
+        """Initialize the sensor."""
+        super().__init__(coordinator, context=TARIFF_PERIOD_CONTEXT)
+        self.entity_description = entity_description
+        self._coordinator = coordinator
+        self._attr_device_info = device_info
+        self._attr_unique_id = f"{entry_id}_{entity_description.key}"
+        self._update_attrs()
+
+    def _update_attrs(self) -> None:
+        """Update state attributes."""
+        config = self._coordinator.config_coordinator.data
+        self._attr_native_value = self._coordinator.tariffs.period
+        self._attr_extra_state_attributes = {
+            "option_tarifaire": config.option_tarifaire,
+            "tarif_courant": config.tarif_courant,
+        }
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Handle updated data from the coordinator."""
+        self._update_attrs()
+        self.async_write_ha_state()
+
+
+class EcocompteurTariffEnergySensor(CoordinatorEntity, SensorEntity):
+    """Energy drawn by a circuit during a tariff period."""
+
+    entity_description: EcocompteurTariffSensorEntityDescription
+
+    _attr_has_entity_name = True
+    _unrecorded_attributes = frozenset({"today"})
+
+    def __init__(
+        self,
+        entity_description: EcocompteurTariffSensorEntityDescription,
+        coordinator: EcocompteurDataUpdateCoordinator,
+        device_info: DeviceInfo,
+        entry_id: str,
+    ) -> None:
+        """Initialize the sensor."""
+        super().__init__(
+            coordinator,
+            context=(entity_description.period, entity_description.config_idx),
+        )
+        self.entity_description = entity_description
+        self._coordinator = coordinator
+        self._attr_device_info = device_info
+        self._attr_unique_id = f"{entry_id}_{entity_description.key}"
         self._update_attrs()
 
     def _update_attrs(self) -> None:
         """Update state attributes."""
-        config = self._coordinator.data["config"]
         config_idx = self.entity_description.config_idx
+        period = self.entity_description.period
+        config_input = self._coordinator.config_coordinator.data.inputs[config_idx]
+        tariffs = self._coordinator.tariffs
+
+        self._attr_name = (
+            f"{config_input.label} energy {period.upper().replace('_', ' ')}"
+        )
+        self._attr_native_value = tariffs.total(period, config_idx)
+        self._attr_extra_state_attributes = {"today": tariffs.today(period, config_idx)}
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Handle updated data from the coordinator."""
+        self._update_attrs()
+        self.async_write_ha_state()
+
+
+class EcocompteurRollupSensor(CoordinatorEntity, SensorEntity):
+    """The latest day, month or year total of a TIC counter or log2.csv column."""
+
+    entity_description: EcocompteurRollupSensorEntityDescription
+
+    _attr_has_entity_name = True
 
-        self._attr_name = config["inputs"][config_idx]["label"]
-        self._attr_available = not config["inputs"][config_idx]["disabled"]
-        if self._attr_available:
-            key = self.entity_description.key
-            values = self._coordinator.data["values"]
-            self._attr_native_value = values[key]
-        else:
+    def __init__(
+        self,
+        entity_description: EcocompteurRollupSensorEntityDescription,
+        coordinator: EcocompteurDataUpdateCoordinator,
+        device_info: DeviceInfo,
+        entry_id: str,
+    ) -> None:
+        """Initialize the sensor."""
+        super().__init__(
+            coordinator,
+            context=(
+                ROLLUP_CONTEXT,
+                entity_description.period,
+                entity_description.series,
+            ),
+        )
+        self.entity_description = entity_description
+        self._coordinator = coordinator
+        self._attr_device_info = device_info
+        self._attr_unique_id = f"{entry_id}_{entity_description.key}"
+        self._update_attrs()
+
+    def _update_attrs(self) -> None:
+        """Update state attributes."""
+        period = self.entity_description.period
+        series = self.entity_description.series
+        label = _rollup_label(series, self._coordinator.config_coordinator.data)
+
+        self._attr_name = f"{label} {_ROLLUP_NAMES[period]} total"
+        if (latest := self._coordinator.rollups.latest(period, series)) is None:
             self._attr_native_value = None
+            self._attr_last_reset = None
+            return
+        key, amount = latest
+        self._attr_native_value = amount
+        self._attr_last_reset = dt_util.start_of_local_day(_bucket_start(period, key))
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Handle updated data from the coordinator."""
+        self._update_attrs()
+        self.async_write_ha_state()
+
+
+class EcocompteurSkippedUpdatesSensor(CoordinatorEntity, SensorEntity):
+    """Count the state writes saved by the coordinators' change detection."""
+
+    _attr_has_entity_name = True
+
+    def __init__(
+        self,
+        entity_description: SensorEntityDescription,
+        coordinator: EcocompteurDataUpdateCoordinator,
+        device_info: DeviceInfo,
+        entry_id: str,
+    ) -> None:
+        """Initialize the sensor."""
+        # Subscribe without context to be called on every refresh
+        super().__init__(coordinator)
+        self.entity_description = entity_description
+        self._coordinator = coordinator
+        self._attr_device_info = device_info
+        self._attr_unique_id = f"{entry_id}_{entity_description.key}"
+        self._update_attrs()
+
+    def _update_attrs(self) -> None:
+        """Update state attributes."""
+        self._attr_native_value = (
+            self._coordinator.skipped_updates
+            + self._coordinator.config_coordinator.skipped_updates
+        )
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Handle updated data from the coordinator."""
+        self._update_attrs()
+        self.async_write_ha_state()
+
+
+class EcocompteurStageSensor(CoordinatorEntity, SensorEntity):
+    """Report the duration of a stage of the polling pipeline."""
+
+    entity_description: EcocompteurStageSensorEntityDescription
+    _attr_has_entity_name = True
+    _unrecorded_attributes = frozenset({"count", "mean", "p50", "p95", "max"})
+
+    def __init__(
+        self,
+        entity_description: EcocompteurStageSensorEntityDescription,
+        coordinator: EcocompteurDataUpdateCoordinator,
+        device_info: DeviceInfo,
+        entry_id: str,
+    ) -> None:
+        """Initialize the sensor."""
+        # Subscribe without context to be called on every refresh
+        super().__init__(coordinator)
+        self.entity_description = entity_description
+        self._histogram = coordinator.client.metrics.stages[entity_description.stage]
+        self._attr_device_info = device_info
+        self._attr_unique_id = f"{entry_id}_{entity_description.key}"
+        self._update_attrs()
+
+    def _update_attrs(self) -> None:
+        """Update state attributes."""
+        histogram = self._histogram
+        self._attr_native_value = histogram.last
+        self._attr_extra_state_attributes = {
+            "count": histogram.count,
+            "mean": histogram.mean,
+            "p50": histogram.percentile(50),
+            "p95": histogram.percentile(95),
+            "max": histogram.max,
+        }
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Handle updated data from the coordinator."""
+        self._update_attrs()
+        self.async_write_ha_state()
+
+
+class EcocompteurRequestErrorsSensor(CoordinatorEntity, SensorEntity):
+    """Count the failed requests to the device, per endpoint."""
+
+    _attr_has_entity_name = True
+
+    def __init__(
+        self,
+        entity_description: SensorEntityDescription,
+        coordinator: EcocompteurDataUpdateCoordinator,
+        device_info: DeviceInfo,
+        entry_id: str,
+    ) -> None:
+        """Initialize the sensor."""
+        # Subscribe without context to be called on every refresh
+        super().__init__(coordinator)
+        self.entity_description = entity_description
+        self._metrics = coordinator.client.metrics
+        self._attr_device_info = device_info
+        self._attr_unique_id = f"{entry_id}_{entity_description.key}"
+        self._update_attrs()
+
+    @property
+    def available(self) -> bool:
+        """Stay available while the device fails, that's when errors count."""
+        return True
+
+    def _update_attrs(self) -> None:
+        """Update state attributes."""
+        self._attr_native_value = self._metrics.errors.total()
+        self._attr_extra_state_attributes = dict(self._metrics.errors)
 
     @callback
     def _handle_coordinator_update(self) -> None:
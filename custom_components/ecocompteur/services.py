@@ -0,0 +1,259 @@
+"""Services of the Ecocompteur integration."""
+
+from __future__ import annotations
+
+from contextlib import aclosing
+from functools import partial
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+import voluptuous as vol
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+    callback,
+)
+from homeassistant.exceptions import HomeAssistantError, ServiceValidationError
+from homeassistant.helpers import config_validation as cv
+from homeassistant.util import dt as dt_util
+from homeassistant.util import slugify
+
+from .api import EcocompteurApiError
+from .const import DOMAIN
+from .export import EXPORT_SUFFIX, WRITE_BATCH_SIZE, EcocompteurExportWriter
+from .importer import LOGS, parse_log_row
+from .model import SAMPLE_KEYS
+from .rollup import PERIOD_DAY, PERIODS, series_unit
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncGenerator, Sequence
+    from datetime import datetime
+
+    from . import EcocompteurConfigEntry
+    from .api import Ecocompteur
+    from .coordinator import EcocompteurDataUpdateCoordinator
+    from .importer import EcocompteurLog
+
+SERVICE_EXPORT = "export"
+SERVICE_GET_ROLLUPS = "get_rollups"
+
+ATTR_CONFIG_ENTRY_ID = "config_entry_id"
+ATTR_START = "start"
+ATTR_END = "end"
+ATTR_TABLES = "tables"
+ATTR_DIRECTORY = "directory"
+ATTR_PERIOD = "period"
+ATTR_SERIES = "series"
+
+SAMPLES_TABLE = "samples"
+EXPORT_TABLES = (SAMPLES_TABLE, *(log.key for log in LOGS))
+
+# Relative to the configuration directory
+DEFAULT_EXPORT_DIRECTORY = "ecocompteur/exports"
+
+EXPORT_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_CONFIG_ENTRY_ID): cv.string,
+        vol.Required(ATTR_START): cv.datetime,
+        vol.Optional(ATTR_END): cv.datetime,
+        vol.Optional(ATTR_TABLES, default=list(EXPORT_TABLES)): vol.All(
+            cv.ensure_list, [vol.In(EXPORT_TABLES)]
+        ),
+        vol.Optional(ATTR_DIRECTORY): cv.string,
+    }
+)
+
+GET_ROLLUPS_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_CONFIG_ENTRY_ID): cv.string,
+        vol.Optional(ATTR_PERIOD, default=PERIOD_DAY): vol.In(PERIODS),
+        vol.Optional(ATTR_START): cv.date,
+        vol.Optional(ATTR_END): cv.date,
+        vol.Optional(ATTR_SERIES): vol.All(cv.ensure_list, [cv.string]),
+    }
+)
+
+# A table is streamed as (column names, timestamp, values) rows
+type ExportRows = AsyncGenerator[tuple[Sequence[str], int, Sequence[float]]]
+
+
+@callback
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the Ecocompteur services."""
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_EXPORT,
+        partial(_async_export, hass),
+        schema=EXPORT_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_GET_ROLLUPS,
+        partial(_async_get_rollups, hass),
+        schema=GET_ROLLUPS_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+
+
+def _loaded_entry(hass: HomeAssistant, entry_id: str) -> EcocompteurConfigEntry:
+    """Return a loaded Ecocompteur config entry."""
+    entry = hass.config_entries.async_get_entry(entry_id)
+    if (
+        entry is None
+        or entry.domain != DOMAIN
+        or entry.state is not ConfigEntryState.LOADED
+    ):
+        raise ServiceValidationError(
+            translation_domain=DOMAIN,
+            translation_key="entry_not_loaded",
+            translation_placeholders={"entry_id": entry_id},
+        )
+    return entry
+
+
+def _export_directory(hass: HomeAssistant, directory: str | None) -> Path:
+    """
+    Return the directory to write exports to.
+
+    The default directory and those below it are always allowed, however
+    they are given. Others must be allowed by allowlist_external_dirs.
+    """
+    default = Path(hass.config.path(DEFAULT_EXPORT_DIRECTORY))
+    if directory is None:
+        return default
+    path = Path(hass.config.path(directory))
+    if not path.resolve().is_relative_to(
+        default.resolve()
+    ) and not hass.config.is_allowed_path(str(path)):
+        raise ServiceValidationError(
+            translation_domain=DOMAIN,
+            translation_key="directory_not_allowed",
+            translation_placeholders={"directory": str(path)},
+        )
+    return path
+
+
+async def _async_export(hass: HomeAssistant, call: ServiceCall) -> ServiceResponse:
+    """
+    Export the data of a device within a time range to CSV files.
+
+    Every table is written to its own file, in batches as rows come in, so
+    that memory use doesn't depend on the range. Tables without any row within
+    the range get no file.
+    """
+    entry = _loaded_entry(hass, call.data[ATTR_CONFIG_ENTRY_ID])
+    start = dt_util.as_utc(call.data[ATTR_START])
+    end = dt_util.as_utc(call.data.get(ATTR_END) or dt_util.utcnow())
+    if start > end:
+        raise ServiceValidationError(
+            translation_domain=DOMAIN, translation_key="invalid_time_range"
+        )
+    directory = _export_directory(hass, call.data.get(ATTR_DIRECTORY))
+    await hass.async_add_executor_job(
+        partial(directory.mkdir, parents=True, exist_ok=True)
+    )
+
+    name = entry.runtime_data.name
+    files: list[dict[str, Any]] = []
+    for table in call.data[ATTR_TABLES]:
+        path = directory / (
+            f"{slugify(name)}_{table}_{start:%Y%m%dT%H%M%SZ}_{end:%Y%m%dT%H%M%SZ}"
+            f"{EXPORT_SUFFIX}"
+        )
+        if table == SAMPLES_TABLE:
+            rows = _async_sample_rows(entry.runtime_data.coordinator, start, end)
+        else:
+            log = next(log for log in LOGS if log.key == table)
+            rows = _async_log_rows(entry.runtime_data.client, log, start, end)
+        try:
+            count = await _async_write_table(hass, path, rows)
+        except EcocompteurApiError as e:
+            raise HomeAssistantError(
+                translation_domain=DOMAIN,
+                translation_key="export_failed",
+                translation_placeholders={"table": table, "name": name},
+            ) from e
+        if count:
+            files.append({"table": table, "path": str(path), "rows": count})
+    return {"files": files}
+
+
+async def _async_get_rollups(hass: HomeAssistant, call: ServiceCall) -> ServiceResponse:
+    """Return the day, month or year totals of a device within a date range."""
+    entry = _loaded_entry(hass, call.data[ATTR_CONFIG_ENTRY_ID])
+    start = call.data.get(ATTR_START)
+    end = call.data.get(ATTR_END)
+    buckets = entry.runtime_data.coordinator.rollups.query(
+        call.data[ATTR_PERIOD],
+        start.isoformat() if start else None,
+        end.isoformat() if end else None,
+        call.data.get(ATTR_SERIES),
+    )
+    series = {name for bucket in buckets.values() for name in bucket}
+    return {
+        "units": {name: series_unit(name) for name in sorted(series)},
+        "buckets": buckets,
+    }
+
+
+async def _async_sample_rows(
+    coordinator: EcocompteurDataUpdateCoordinator, start: datetime, end: datetime
+) -> ExportRows:
+    """Yield the real-time samples held by a coordinator within a time range."""
+    for values in coordinator.samples.window(start.timestamp(), end.timestamp()):
+        yield SAMPLE_KEYS, values.timestamp, values.values
+
+
+async def _async_log_rows(
+    client: Ecocompteur, log: EcocompteurLog, start: datetime, end: datetime
+) -> ExportRows:
+    """Yield the rows of a device log within a time range."""
+    columns: list[str] = []
+    async with aclosing(log.stream_fn(client, 0)) as lines:
+        async for line in lines:
+            if line.end == line.start:
+                # Still being written
+                break
+            if line.start == 0:
+                columns = line.text.strip().split(",")[log.time_columns :]
+                continue
+            if (row := parse_log_row(log, columns, line.text)) is None:
+                continue
+            row_start, values = row
+            if row_start < start:
+                continue
+            if row_start > end:
+                # Rows are logged in time order
+                break
+            yield columns, int(row_start.timestamp()), values
+
+
+async def _async_write_table(hass: HomeAssistant, path: Path, rows: ExportRows) -> int:
+    """Write rows to an export file, return their number."""
+    writer: EcocompteurExportWriter | None = None
+    batch: list[tuple[int, Sequence[float]]] = []
+    try:
+        # Closed on errors too, releasing the device connection of a log
+        async with aclosing(rows):
+            async for names, timestamp, values in rows:
+                if writer is None:
+                    writer = await hass.async_add_executor_job(
+                        EcocompteurExportWriter, path, names
+                    )
+                batch.append((timestamp, values))
+                if len(batch) == WRITE_BATCH_SIZE:
+                    await hass.async_add_executor_job(writer.write, batch)
+                    batch = []
+        if writer is None:
+            return 0
+        await hass.async_add_executor_job(writer.write, batch)
+        await hass.async_add_executor_job(writer.close)
+    except BaseException:
+        if writer is not None:
+            await hass.async_add_executor_job(writer.abort)
+        raise
+    return writer.rows
@@ -0,0 +1,98 @@
+"""Streaming of Ecocompteur real-time values."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from time import monotonic
+from typing import TYPE_CHECKING
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.debounce import Debouncer
+from homeassistant.helpers.update_coordinator import UpdateFailed
+
+from .api import EcocompteurApiError, EcocompteurJSONDecodeError
+
+if TYPE_CHECKING:
+    from .coordinator import EcocompteurDataUpdateCoordinator
+    from .model import EcocompteurValues
+
+_LOGGER = logging.getLogger(__name__)
+
+# Minimum time (s) between the start of two requests. Requests never overlap
+# anyway; this only keeps a device answering very fast from being hammered.
+STREAM_MIN_PERIOD = 0.25
+
+# Entities are updated right away when a sample arrives after a quiet period,
+# then at most once per cooldown (s) with the latest sample.
+STREAM_PUBLISH_COOLDOWN = 0.5
+
+
+class EcocompteurStreamer:
+    """
+    Fetch real-time values back-to-back instead of polling at intervals.
+
+    A single request is in flight at any time, on the client's keep-alive
+    connection, and the next one starts as soon as the previous answer is
+    in. Samples are recorded by the coordinator as they arrive, while entity
+    updates go through a debouncer. Errors are reported to the coordinator
+    and retried with its scheduler's back-off.
+    """
+
+    def __init__(
+        self, hass: HomeAssistant, coordinator: EcocompteurDataUpdateCoordinator
+    ) -> None:
+        """Initialize the streamer."""
+        self.hass = hass
+        self.coordinator = coordinator
+        self._data: EcocompteurValues | None = None
+        self._debouncer: Debouncer[None] = Debouncer(
+            hass,
+            _LOGGER,
+            cooldown=STREAM_PUBLISH_COOLDOWN,
+            immediate=True,
+            function=self._async_publish,
+        )
+
+    @callback
+    def _async_publish(self) -> None:
+        """Push the latest sample to the entities."""
+        if self._data is not None:
+            self.coordinator.async_set_updated_data(self._data)
+
+    async def async_run(self) -> None:
+        """Stream real-time values until cancelled."""
+        coordinator = self.coordinator
+        while True:
+            start = monotonic()
+            try:
+                data = await coordinator.client.fetch_inst()
+            except EcocompteurApiError:
+                self._async_fail("Error communicating with Ecocompteur")
+            except EcocompteurJSONDecodeError:
+                self._async_fail("Error decoding Ecocompteur JSON response")
+            else:
+                self._async_handle_sample(data, monotonic() - start)
+                await asyncio.sleep(max(0.0, start + STREAM_MIN_PERIOD - monotonic()))
+                continue
+            await asyncio.sleep(coordinator.scheduler.failure().total_seconds())
+
+    @callback
+    def _async_handle_sample(self, data: EcocompteurValues, latency: float) -> None:
+        """Record a sample and schedule the entity update."""
+        coordinator = self.coordinator
+        coordinator.scheduler.success(latency, data.power)
+        coordinator.async_add_sample(data)
+        self._data = data
+        self._debouncer.async_schedule_call()
+
+    @callback
+    def _async_fail(self, message: str) -> None:
+        """Publish a failure right away, entities become unavailable."""
+        self._debouncer.async_cancel()
+        self.coordinator.async_set_update_error(UpdateFailed(message))
+
+    @callback
+    def async_shutdown(self) -> None:
+        """Cancel a pending entity update."""
+        self._debouncer.async_shutdown()
@@ -0,0 +1,148 @@
+"""Accounting of the Ecocompteur circuit energy per tariff period."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
+
+from .const import POWER_KEYS
+from .model import CONSO_KEYS
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Sequence
+
+    from .model import EcocompteurConfig
+
+# Number of days of per-day totals kept, today included
+DAILY_HISTORY = 31
+
+# TIC counters of the tariff options (option_tarifaire) whose codes are known.
+# 4 is the off-peak/peak (HC/HP) option.
+TARIFF_OPTION_COUNTERS: dict[int, tuple[str, ...]] = {
+    4: ("hc", "hp"),
+}
+
+
+class EcocompteurTariffAccounting:
+    """
+    Attribute the energy drawn by every circuit to the active tariff period.
+
+    Tariff periods are named after the TIC counters of data.json (base, hc,
+    hp, hc_b, hp_b, hc_w, hp_w, hc_r, hp_r). The device reports the active
+    period as a tarif_courant code whose meaning depends on the tariff option,
+    so the code of every period is learned: when a single TIC counter went up
+    between two data.json polls, its period is the active one and the current
+    code is recorded for it. A known code then switches the period as soon as
+    it is reported. Learned codes are forgotten when the tariff option changes.
+
+    The TIC counters in use are those of the tariff option, from
+    TARIFF_OPTION_COUNTERS, or for other options those found not zero since
+    the option is active. They only change with the option: counters reading
+    zero, e.g. while the TIC link is down, are not dropped. They are None
+    until known, i.e. until a snapshot of a known option or with a counter
+    not zero was seen.
+
+    Running totals are kept per period, and per period and day for the last
+    DAILY_HISTORY days. They are in Wh, one value per circuit.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        totals: dict[str, list[float]] | None = None,
+        days: dict[str, dict[str, list[float]]] | None = None,
+        codes: dict[int, str] | None = None,
+        option: int | None = None,
+        period: str | None = None,
+        counters: Iterable[str] | None = None,
+    ) -> None:
+        """Initialize the accounting."""
+        self.totals = totals or {}
+        self.days = days or {}
+        # Day of the latest energy added
+        self.day = max(self.days) if self.days else None
+        self.period = period
+        self.counters: set[str] | None = None if counters is None else set(counters)
+        self._codes = codes or {}
+        self._option = option
+
+    def update_config(
+        self, config: EcocompteurConfig, previous: EcocompteurConfig | None
+    ) -> None:
+        """Follow the active period from a new data.json snapshot."""
+        if config.option_tarifaire != self._option:
+            self._codes.clear()
+            self.counters = None
+            self._option = config.option_tarifaire
+        if counters := TARIFF_OPTION_COUNTERS.get(config.option_tarifaire) or [
+            key for key, value in zip(CONSO_KEYS, config.conso, strict=True) if value
+        ]:
+            self.counters = {*(self.counters or ()), *counters}
+        if previous is not None:
+            advanced = [
+                key
+                for key, current, last in zip(
+                    CONSO_KEYS, config.conso, previous.conso, strict=True
+                )
+                if current > last
+            ]
+            if len(advanced) == 1:
+                self.period = self._codes[config.tarif_courant] = advanced[0]
+                return
+        # Until a code is learned, keep the period of the previous snapshot
+        self.period = self._codes.get(config.tarif_courant, self.period)
+
+    def add(self, day: str, energy: Sequence[float]) -> None:
+        """Add the energy drawn by every circuit on a day to the active period."""
+        if self.period is None:
+            return
+        self.day = day
+        totals = self.totals.setdefault(self.period, [0.0] * len(POWER_KEYS))
+        daily = self.days.setdefault(day, {}).setdefault(
+            self.period, [0.0] * len(POWER_KEYS)
+        )
+        for idx, value in enumerate(energy):
+            totals[idx] += value
+            daily[idx] += value
+        if len(self.days) > DAILY_HISTORY:
+            del self.days[min(self.days)]
+
+    def total(self, period: str, circuit: int) -> float:
+        """Return the energy drawn by a circuit during a period."""
+        return self.totals[period][circuit]
+
+    def daily(self, day: str, period: str, circuit: int) -> float:
+        """Return the energy drawn by a circuit during a period on a day."""
+        if (totals := self.days.get(day, {}).get(period)) is None:
+            return 0.0
+        return totals[circuit]
+
+    def today(self, period: str, circuit: int) -> float:
+        """Return the energy drawn by a circuit during a period on the last day."""
+        if self.day is None:
+            return 0.0
+        return self.daily(self.day, period, circuit)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the accounting state to persist."""
+        return {
+            "totals": self.totals,
+            "days": self.days,
+            "codes": self._codes,
+            "option": self._option,
+            "period": self.period,
+            "counters": None if self.counters is None else sorted(self.counters),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any] | None) -> EcocompteurTariffAccounting:
+        """Restore the accounting from its persisted state."""
+        if not data:
+            return cls()
+        return cls(
+            data["totals"],
+            data["days"],
+            # JSON object keys are strings
+            {int(code): period for code, period in data["codes"].items()},
+            data["option"],
+            data["period"],
+            data.get("counters"),
+        )
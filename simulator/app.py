@@ -7,7 +7,6 @@ for testing purposes.
 
 import json
 import random
-import time
 from datetime import UTC, datetime
 
 from flask import Flask, Response
@@ -68,7 +67,8 @@ def data_json() -> Response:
 @app.route("/inst.json")
 def inst_json() -> Response:
     """Serve real-time instantaneous data with dynamic values."""
-    now = datetime.now(tz=UTC)
+    # Local wall-clock time, counted as if it were UTC in Date_Time
+    now = datetime.now().astimezone().replace(tzinfo=UTC)
     data = {
         "data1": get_current_power(),
         "data2": round(random.uniform(0, 50), 2),  # noqa: S311
@@ -89,7 +89,7 @@ def inst_json() -> Response:
         "CIR3_Vol": 0.0,
         "CIR4_Nrj": 0.0,
         "CIR4_Vol": 0.0,
-        "Date_Time": int(time.time()),
+        "Date_Time": int(now.timestamp()),
     }
     return Response(json.dumps(data), mimetype="application/json")
 
@@ -0,0 +1,199 @@
+"""
+Virtual Ecocompteur device.
+
+Holds the state of one simulated device and advances it over time: circuit
+power follows a random walk with occasional appliance bursts, TIC and pulse
+counters go up, and a row is appended to the log files for every elapsed
+hour and day.
+"""
+
+from __future__ import annotations
+
+import json
+import random
+from datetime import UTC, datetime, timedelta
+
+# Tariff option "HC/HP": tarif_courant 11 is off-peak, 12 is peak.
+OPTION_HC_HP = 4
+TARIF_HC = 11
+TARIF_HP = 12
+
+LOG1_HEADER = (
+    "Date,Heure,Circuit1,Circuit2,Circuit3,Circuit4,Circuit5,"
+    "TIC1,TIC2,TIC3,TIC4,TIC5,TIC6"
+)
+LOG2_HEADER = (
+    "Date,Circuit1_Total,Circuit2_Total,Circuit3_Total,"
+    "Circuit4_Total,Circuit5_Total,Water_Total,Gas_Total"
+)
+
+LABELS = (
+    "Consommation globale",
+    "Cumulus             ",
+    "Cuisine             ",
+    "Prises de Courant",
+    "Informatique        ",
+)
+PULSE_LABELS = ("Eau", "Gaz", "Eau Chaude", "Chauffage", "Climatisation", "Piscine")
+
+# Baseline power (W) of circuits 2 to 5; circuit 1 is the sum of the others
+# plus unmonitored loads.
+BASE_POWER = (0.0, 15.0, 10.0, 60.0)
+BURST_POWER = (2400.0, 2000.0, 800.0, 150.0)
+BURST_PROBABILITY = 0.002
+
+
+class VirtualEcocompteur:
+    """State of a simulated Ecocompteur."""
+
+    def __init__(
+        self,
+        seed: int,
+        start: datetime,
+        history: timedelta,
+        *,
+        leading_zeros: bool = False,
+    ) -> None:
+        """Initialize the device with some history."""
+        self._random = random.Random(seed)  # noqa: S311
+        self.leading_zeros = leading_zeros
+        self.power = list(BASE_POWER)
+        self.bursts = [0.0] * len(BASE_POWER)
+        self.conso_hc = self._random.uniform(1e6, 1e7)
+        self.conso_hp = self._random.uniform(1e6, 1e7)
+        self.water = self._random.uniform(10, 500)  # m³, logged in L
+        self.gas = self._random.uniform(10, 500)  # m³
+        self.circuit_totals = [0.0] * 5  # Wh
+        self.hour_energy = [0.0] * 5  # Wh
+        self.hour_tic = [0.0] * 6  # Wh
+        self.log1: list[str] = []
+        self.log2: list[str] = []
+        self.now = start - history
+        self.advance(start)
+
+    @property
+    def tarif_courant(self) -> int:
+        """Return the current tariff period."""
+        return TARIF_HC if self.now.hour >= 22 or self.now.hour < 6 else TARIF_HP  # noqa: PLR2004
+
+    def circuit_power(self) -> list[float]:
+        """Return the power drawn by the 5 circuits."""
+        circuits = [
+            power + burst for power, burst in zip(self.power, self.bursts, strict=True)
+        ]
+        return [sum(circuits) + 120.0, *circuits]
+
+    def advance(self, now: datetime, step: timedelta = timedelta(minutes=1)) -> None:
+        """Advance the device state up to now."""
+        while self.now + step <= now:
+            self._step(step)
+        # Sub-step jitter so that successive polls see moving values
+        self.power = [
+            max(0.0, power + self._random.gauss(0, 2)) for power in self.power
+        ]
+
+    def _step(self, step: timedelta) -> None:
+        """Advance the device state by one step."""
+        previous = self.now
+        self.now += step
+        hours = step.total_seconds() / 3600
+
+        for idx, base in enumerate(BASE_POWER):
+            self.power[idx] = max(
+                0.0, self.power[idx] + 0.1 * (base - self.power[idx])
+            ) + self._random.gauss(0, base * 0.05 + 1)
+            if self.bursts[idx]:
+                if self._random.random() < 0.05:  # noqa: PLR2004
+                    self.bursts[idx] = 0.0
+            elif self._random.random() < BURST_PROBABILITY:
+                self.bursts[idx] = BURST_POWER[idx]
+
+        power = self.circuit_power()
+        energy = [value * hours for value in power]
+        for idx, value in enumerate(energy):
+            self.circuit_totals[idx] += value
+            self.hour_energy[idx] += value
+        if self.tarif_courant == TARIF_HC:
+            self.conso_hc += energy[0]
+            self.hour_tic[0] += energy[0]
+        else:
+            self.conso_hp += energy[0]
+            self.hour_tic[1] += energy[0]
+        self.water += self._random.uniform(0, 0.0005)
+        self.gas += self._random.uniform(0, 0.0008)
+
+        if self.now.hour != previous.hour:
+            self._log_hour(previous)
+        if self.now.day != previous.day:
+            self._log_day(previous)
+
+    def _log_hour(self, hour: datetime) -> None:
+        """Append the elapsed hour to log1.csv."""
+        values = ",".join(f"{value:.2f}" for value in self.hour_energy + self.hour_tic)
+        self.log1.append(f"{hour:%Y-%m-%d},{hour:%H}:00,{values}")
+        self.hour_energy = [0.0] * 5
+        self.hour_tic = [0.0] * 6
+
+    def _log_day(self, day: datetime) -> None:
+        """Append the elapsed day to log2.csv."""
+        values = ",".join(
+            f"{value:.2f}"
+            for value in [*self.circuit_totals, self.water * 1000, self.gas]
+        )
+        self.log2.append(f"{day:%Y-%m-%d},{values}")
+
+    def data_json(self) -> str:
+        """Return the data.json document."""
+        data: dict[str, int | str] = {
+            "option_tarifaire": OPTION_HC_HP,
+            "tarif_courant": self.tarif_courant,
+            "isousc": 45,
+            "conso_base": 0,
+            "conso_hc": int(self.conso_hc),
+            "conso_hp": int(self.conso_hp),
+            "conso_hc_b": 0,
+            "conso_hp_b": 0,
+            "conso_hc_w": 0,
+            "conso_hp_w": 0,
+            "conso_hc_r": 0,
+            "conso_hp_r": 0,
+            **{f"type_imp_{i}": 1 for i in range(6)},
+            **{f"label_entree{i + 1}": label for i, label in enumerate(LABELS)},
+            **{f"label_entree_imp{i}": label for i, label in enumerate(PULSE_LABELS)},
+            **{f"entree_imp{i}_disabled": int(i > 0) for i in range(6)},
+        }
+        if not self.leading_zeros:
+            return json.dumps(data)
+        # Like the real device: one field per line, zero-padded integers
+        fields = ",\n".join(
+            f'"{key}" : {value:09d}'
+            if isinstance(value, int)
+            else f'"{key}" : "{value}"'
+            for key, value in data.items()
+        )
+        return f"{{\n{fields}\n}}"
+
+    def inst_json(self) -> str:
+        """Return the inst.json document."""
+        power = self.circuit_power()
+        data = {
+            **{f"data{idx + 1}": round(value, 6) for idx, value in enumerate(power)},
+            "data6": round(self.water, 6),
+            "data6m3": round(self.water, 6),
+            "data7": round(self.gas, 6),
+            "data7m3": round(self.gas, 6),
+            "heure": self.now.hour,
+            "minute": self.now.minute,
+            **{f"CIR{i}_Nrj": 0.0 for i in range(1, 5)},
+            **{f"CIR{i}_Vol": 0.0 for i in range(1, 5)},
+            "Date_Time": int(self.now.replace(tzinfo=UTC).timestamp()),
+        }
+        return json.dumps(data, separators=(",", ":"))
+
+    def log1_csv(self) -> str:
+        """Return the log1.csv document."""
+        return "\n".join([LOG1_HEADER, *self.log1, ""])
+
+    def log2_csv(self) -> str:
+        """Return the log2.csv document."""
+        return "\n".join([LOG2_HEADER, *self.log2, ""])
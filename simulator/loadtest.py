@@ -0,0 +1,253 @@
+"""
+Ecocompteur multi-device load-test simulator.
+
+Runs N virtual Ecocompteurs on an asyncio server, either one per port or one
+per path prefix (/dev/<n>/data.json) on a single port. Every device has its
+own evolving state, and responses can be delayed, made to fail or served in
+the zero-padded JSON format of the real device. Log files can be served
+partially to range requests.
+
+Usage:
+    python loadtest.py --devices 50 --port 8100 --latency 0.05 --jitter 0.02
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import logging
+import random
+import zlib
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING
+
+from aiohttp import web
+from device import VirtualEcocompteur
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable
+
+_LOGGER = logging.getLogger(__name__)
+
+DEVICE_KEY: web.AppKey[VirtualEcocompteur] = web.AppKey("device")
+CLOCK_KEY: web.AppKey[SimulatorClock] = web.AppKey("clock")
+BEHAVIOR_KEY: web.AppKey[SimulatorBehavior] = web.AppKey("behavior")
+
+# How long a "hung" request waits before being answered; long enough to hit
+# any client timeout.
+HANG_DURATION = 60
+
+
+@dataclass(frozen=True, kw_only=True)
+class SimulatorBehavior:
+    """Describe how the simulated devices answer requests."""
+
+    latency: float
+    jitter: float
+    error_rate: float
+    hang_rate: float
+    etag: bool
+    ranges: bool
+
+
+class SimulatorClock:
+    """Simulated time, optionally running faster than real time."""
+
+    def __init__(self, speed: float) -> None:
+        """Initialize the clock."""
+        self.speed = speed
+        # Devices keep local wall-clock time
+        self._origin = datetime.now().astimezone().replace(tzinfo=None)
+        self._loop_origin = asyncio.get_running_loop().time()
+
+    def now(self) -> datetime:
+        """Return the simulated time."""
+        elapsed = asyncio.get_running_loop().time() - self._loop_origin
+        return self._origin + timedelta(seconds=elapsed * self.speed)
+
+
+async def _respond(
+    request: web.Request,
+    render: Callable[[VirtualEcocompteur], str],
+    content_type: str,
+) -> web.Response:
+    """Advance the device state and answer with one of its documents."""
+    behavior = request.app[BEHAVIOR_KEY]
+    delay = behavior.latency + random.uniform(-behavior.jitter, behavior.jitter)  # noqa: S311
+    if random.random() < behavior.hang_rate:  # noqa: S311
+        delay = HANG_DURATION
+    if delay > 0:
+        await asyncio.sleep(delay)
+    if random.random() < behavior.error_rate:  # noqa: S311
+        raise web.HTTPInternalServerError
+    device = request.app[DEVICE_KEY]
+    device.advance(request.app[CLOCK_KEY].now())
+    text = render(device)
+    if behavior.ranges and request.http_range.start is not None:
+        return _partial_response(request, text, content_type)
+    if not behavior.etag:
+        return web.Response(text=text, content_type=content_type)
+    etag = f"{zlib.crc32(text.encode()):08x}"
+    if request.if_none_match and any(
+        candidate.value == etag for candidate in request.if_none_match
+    ):
+        return web.Response(status=304, headers={"ETag": f'"{etag}"'})
+    response = web.Response(text=text, content_type=content_type)
+    response.etag = etag
+    return response
+
+
+def _partial_response(
+    request: web.Request, text: str, content_type: str
+) -> web.Response:
+    """Answer a range request on a document."""
+    body = text.encode()
+    start, stop, _ = request.http_range.indices(len(body))
+    if start >= len(body):
+        return web.Response(
+            status=416, headers={"Content-Range": f"bytes */{len(body)}"}
+        )
+    return web.Response(
+        status=206,
+        body=body[start:stop],
+        content_type=content_type,
+        headers={"Content-Range": f"bytes {start}-{stop - 1}/{len(body)}"},
+    )
+
+
+def _handler(
+    render: Callable[[VirtualEcocompteur], str], content_type: str
+) -> Callable[[web.Request], Awaitable[web.Response]]:
+    async def handler(request: web.Request) -> web.Response:
+        return await _respond(request, render, content_type)
+
+    return handler
+
+
+def create_device_app(
+    device: VirtualEcocompteur, clock: SimulatorClock, behavior: SimulatorBehavior
+) -> web.Application:
+    """Create the application serving one virtual device."""
+    app = web.Application()
+    app[DEVICE_KEY] = device
+    app[CLOCK_KEY] = clock
+    app[BEHAVIOR_KEY] = behavior
+    app.router.add_get(
+        "/data.json", _handler(VirtualEcocompteur.data_json, "application/json")
+    )
+    app.router.add_get(
+        "/inst.json", _handler(VirtualEcocompteur.inst_json, "application/json")
+    )
+    app.router.add_get("/log1.csv", _handler(VirtualEcocompteur.log1_csv, "text/csv"))
+    app.router.add_get("/log2.csv", _handler(VirtualEcocompteur.log2_csv, "text/csv"))
+    return app
+
+
+def create_devices(args: argparse.Namespace, now: datetime) -> list[VirtualEcocompteur]:
+    """Create the virtual devices."""
+    return [
+        VirtualEcocompteur(
+            args.seed + idx,
+            now,
+            timedelta(days=args.history_days),
+            leading_zeros=args.leading_zeros,
+        )
+        for idx in range(args.devices)
+    ]
+
+
+async def async_main(args: argparse.Namespace) -> None:
+    """Run the simulator until cancelled."""
+    clock = SimulatorClock(args.speed)
+    behavior = SimulatorBehavior(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        hang_rate=args.hang_rate,
+        etag=args.etag,
+        ranges=args.ranges,
+    )
+    devices = create_devices(args, clock.now())
+
+    runners: list[web.AppRunner] = []
+    if args.per_port:
+        for idx, device in enumerate(devices):
+            runner = web.AppRunner(
+                create_device_app(device, clock, behavior), access_log=None
+            )
+            await runner.setup()
+            await web.TCPSite(runner, args.host, args.port + idx).start()
+            runners.append(runner)
+        hosts = [f"{args.host}:{args.port + idx}" for idx in range(len(devices))]
+    else:
+        root = web.Application()
+        for idx, device in enumerate(devices):
+            root.add_subapp(f"/dev/{idx}", create_device_app(device, clock, behavior))
+        runner = web.AppRunner(root, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, args.host, args.port).start()
+        runners.append(runner)
+        hosts = [f"{args.host}:{args.port}/dev/{idx}" for idx in range(len(devices))]
+
+    _LOGGER.info("Serving %s devices: %s ... %s", len(devices), hosts[0], hosts[-1])
+    try:
+        await asyncio.Event().wait()
+    finally:
+        for runner in runners:
+            await runner.cleanup()
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--devices", type=int, default=10)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument(
+        "--per-port",
+        action="store_true",
+        help="serve each device on its own port instead of under /dev/<n>/",
+    )
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="seconds")
+    parser.add_argument(
+        "--error-rate", type=float, default=0.0, help="fraction of HTTP 500 answers"
+    )
+    parser.add_argument(
+        "--hang-rate",
+        type=float,
+        default=0.0,
+        help=f"fraction of requests answered after {HANG_DURATION} s",
+    )
+    parser.add_argument(
+        "--leading-zeros",
+        action="store_true",
+        help="serve data.json with zero-padded integers like the real device",
+    )
+    parser.add_argument(
+        "--etag",
+        action="store_true",
+        help="send ETags and answer conditional requests with 304 Not Modified",
+    )
+    parser.add_argument(
+        "--ranges",
+        action="store_true",
+        help="answer range requests on the log files with 206 Partial Content",
+    )
+    parser.add_argument(
+        "--speed",
+        type=float,
+        default=1.0,
+        help="simulated seconds per real second, to grow the logs faster",
+    )
+    parser.add_argument("--history-days", type=float, default=7.0)
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    with contextlib.suppress(KeyboardInterrupt):
+        asyncio.run(async_main(parse_args()))
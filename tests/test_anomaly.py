@@ -0,0 +1,88 @@
+"""Tests of the abnormal load detection against daily cycles."""
+
+from __future__ import annotations
+
+import math
+import random
+from dataclasses import dataclass, field
+
+import pytest
+
+from custom_components.ecocompteur.anomaly import WARMUP, EcocompteurAnomalyDetector
+from custom_components.ecocompteur.const import POWER_KEYS
+
+# Circuits simulated, one reading a minute over DAYS days:
+# - steady idles at IDLE W with NOISE W of noise
+# - nightly draws LOAD W more every night from 22:00 to 02:00, like a water
+#   heater on off-peak hours
+# - stuck gets a LOAD W load stuck on halfway through
+STEADY, NIGHTLY, STUCK = range(3)
+
+DAYS = 60
+STEP = 60
+IDLE = 50.0
+NOISE = 30.0
+LOAD = 2000.0
+
+# Seconds after the start at which the spread of the steady circuit is checked
+SIGMA_CHECK = 7200
+
+
+@dataclass
+class Run:
+    """Events and measures of a simulated run."""
+
+    events: list[list[int]] = field(default_factory=lambda: [[], [], []])
+    sigma: float = 0.0
+    stuck_reported: int = 0
+
+
+def _power(elapsed: int, rng: random.Random) -> list[float]:
+    """Return the power of the circuits, the others at 0 W."""
+    hour = elapsed % 86400 / 3600
+    nightly = IDLE + (LOAD if hour >= 22 or hour < 2 else 0.0)  # noqa: PLR2004
+    stuck = IDLE + (LOAD if elapsed >= DAYS * 86400 / 2 else 0.0)
+    power = [max(0.0, value + rng.gauss(0, NOISE)) for value in (IDLE, nightly, stuck)]
+    return power + [0.0] * (len(POWER_KEYS) - len(power))
+
+
+@pytest.fixture(scope="module")
+def run() -> Run:
+    """Feed a detector with the simulated circuits."""
+    rng = random.Random(0)  # noqa: S311
+    detector = EcocompteurAnomalyDetector()
+    result = Run()
+    stuck_since: int | None = None
+    for elapsed in range(0, DAYS * 86400, STEP):
+        for circuit in detector.update(1_700_000_000 + elapsed, _power(elapsed, rng)):
+            if circuit <= STUCK:
+                result.events[circuit].append(elapsed)
+        if elapsed == SIGMA_CHECK:
+            result.sigma = math.sqrt(detector.variance[STEADY])
+        if detector.abnormal[STUCK]:
+            stuck_since = elapsed if stuck_since is None else stuck_since
+            result.stuck_reported = max(result.stuck_reported, elapsed - stuck_since)
+        else:
+            stuck_since = None
+    return result
+
+
+def test_spread_learned_quickly(run: Run) -> None:
+    """The spread of a steady circuit is close to the true one within hours."""
+    assert run.sigma == pytest.approx(NOISE, rel=0.2)
+
+
+def test_steady_not_reported(run: Run) -> None:
+    """A steady circuit is never reported."""
+    assert not run.events[STEADY]
+
+
+def test_daily_cycle_learned(run: Run) -> None:
+    """A load running every night isn't reported once warmed up."""
+    assert not [time for time in run.events[NIGHTLY] if time >= WARMUP]
+
+
+def test_stuck_load_reported(run: Run) -> None:
+    """A load stuck on is reported, and for at least an hour."""
+    assert run.events[STUCK]
+    assert run.stuck_reported >= 3600  # noqa: PLR2004
@@ -0,0 +1,66 @@
+"""Tests of the parsing of the Ecocompteur documents."""
+
+from __future__ import annotations
+
+from datetime import UTC, datetime
+from typing import TYPE_CHECKING
+
+import pytest
+from homeassistant.util import dt as dt_util
+
+from custom_components.ecocompteur.api import device_time
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+
+@pytest.fixture(autouse=True)
+def paris() -> Iterator[None]:
+    """Run in the Europe/Paris time zone."""
+    default = dt_util.get_default_time_zone()
+    dt_util.set_default_time_zone(dt_util.get_time_zone("Europe/Paris"))
+    yield
+    dt_util.set_default_time_zone(default)
+
+
+def _date_time(wall_clock: str) -> int:
+    """Return the Date_Time of a local wall-clock time, as the device counts it."""
+    return int(datetime.fromisoformat(wall_clock).replace(tzinfo=UTC).timestamp())
+
+
+def test_local_time() -> None:
+    """Date_Time is the local wall-clock time."""
+    assert device_time(1727865642) == int(
+        datetime.fromisoformat("2024-10-02T10:40:42+02:00").timestamp()
+    )
+
+
+def test_clocks_going_back() -> None:
+    """Device time keeps increasing through the hour repeated in autumn."""
+    times = []
+    for wall_clock in (
+        "2025-10-26T01:55",
+        "2025-10-26T02:30",
+        "2025-10-26T02:59",
+        "2025-10-26T02:00",
+        "2025-10-26T02:30",
+        "2025-10-26T03:00",
+    ):
+        times.append(device_time(_date_time(wall_clock), times[-1] if times else None))
+    assert times == [
+        int(datetime.fromisoformat(utc).timestamp())
+        for utc in (
+            "2025-10-25T23:55+00:00",
+            "2025-10-26T00:30+00:00",
+            "2025-10-26T00:59+00:00",
+            "2025-10-26T01:00+00:00",
+            "2025-10-26T01:30+00:00",
+            "2025-10-26T02:00+00:00",
+        )
+    ]
+
+
+def test_clock_set_back() -> None:
+    """A clock set back outside of the repeated hour goes back."""
+    previous = device_time(_date_time("2025-06-01T12:00"))
+    assert device_time(_date_time("2025-06-01T11:00"), previous) == previous - 3600
@@ -0,0 +1,86 @@
+"""Tests of the ring buffer of real-time samples."""
+
+from __future__ import annotations
+
+import random
+from itertools import pairwise
+
+import pytest
+
+from custom_components.ecocompteur.buffer import (
+    DEFAULT_CAPACITY,
+    MEMORY_BUDGET,
+    MIN_CAPACITY,
+    EcocompteurSampleBuffer,
+    buffer_capacity,
+)
+from custom_components.ecocompteur.model import SAMPLE_KEYS, EcocompteurValues
+
+CAPACITY = 16
+
+
+def _timestamps(count: int, rng: random.Random) -> list[int]:
+    """Return device times, mostly increasing, sometimes repeated or older."""
+    timestamps = []
+    timestamp = 1_700_000_000
+    for _ in range(count):
+        timestamp += rng.choice((5, 5, 5, 5, 5, 5, 0, -5, -20))
+        timestamps.append(timestamp)
+    return timestamps
+
+
+def _sample(timestamp: int, value: float) -> EcocompteurValues:
+    return EcocompteurValues(timestamp, (value,) * len(SAMPLE_KEYS))
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_windows_stay_in_order(seed: int) -> None:
+    """Repeated and late samples are ignored, windows match the samples kept."""
+    rng = random.Random(seed)  # noqa: S311
+    buffer = EcocompteurSampleBuffer(CAPACITY)
+    kept: list[EcocompteurValues] = []
+    for idx, timestamp in enumerate(_timestamps(500, rng)):
+        sample = _sample(timestamp, float(idx))
+        if buffer.append(sample):
+            kept.append(sample)
+        expected = kept[-CAPACITY:]
+        assert all(
+            earlier.timestamp < later.timestamp for earlier, later in pairwise(expected)
+        )
+        bounds = [None, *(sample.timestamp for sample in expected[::4])]
+        for start in bounds:
+            for end in bounds:
+                assert buffer.window(start, end) == [
+                    sample
+                    for sample in expected
+                    if (start is None or sample.timestamp >= start)
+                    and (end is None or sample.timestamp <= end)
+                ]
+
+
+def test_clear() -> None:
+    """Samples older than the dropped ones are kept after a clear."""
+    buffer = EcocompteurSampleBuffer(CAPACITY)
+    buffer.append(_sample(1000, 1.0))
+    assert not buffer.append(_sample(900, 2.0))
+    buffer.clear()
+    assert buffer.append(_sample(900, 2.0))
+    assert buffer.window() == [_sample(900, 2.0)]
+
+
+def test_counters_keep_their_digits() -> None:
+    """Pulse counters are kept as doubles, whole watts as floats."""
+    buffer = EcocompteurSampleBuffer(CAPACITY)
+    values = (178.0, 0.0, 1.5, 2.0, 3.0, 64.903999, 1234567.891234, 0.0, 0.0, 0.0, 0.0)
+    buffer.append(EcocompteurValues(1000, values))
+    assert buffer.latest == EcocompteurValues(1000, values)
+    assert buffer.series("data7") == [(1000, 1234567.891234)]
+
+
+@pytest.mark.parametrize("devices", [1, 10, 20, 50, 100, 200])
+def test_capacity_within_budget(devices: int) -> None:
+    """Buffers of all devices fit in the budget, down to the minimum capacity."""
+    capacity = buffer_capacity(devices)
+    assert MIN_CAPACITY <= capacity <= DEFAULT_CAPACITY
+    if capacity > MIN_CAPACITY:
+        assert devices * EcocompteurSampleBuffer(capacity).nbytes <= MEMORY_BUDGET